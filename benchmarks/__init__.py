@@ -0,0 +1,6 @@
+"""
+Includes benchmarks used to measure the performance of the implementation.
+
+Each benchmark can be executed as a script from the repository root, for example:
+    python -m benchmarks.import_time
+"""
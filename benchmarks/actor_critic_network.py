@@ -0,0 +1,62 @@
+# RL IMPLEMENTATIONS - ACTOR-CRITIC NETWORK BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Compares a shared-torso actor-critic network (single fused forward pass) against
+# two separate MLPs (policy and value), both when acting and when computing the loss
+
+# IMPORTS #
+import argparse
+import timeit
+
+import torch
+from torch.nn import ReLU, Identity
+
+from rl_methods.neural_networks import mlp, actor_critic_mlp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares shared and separate actor-critic networks")
+    parser.add_argument("--obs-size", type=int, default=4)
+    parser.add_argument("--act-size", type=int, default=2)
+    parser.add_argument("--hidden-sizes", type=int, nargs="+", default=[64, 64])
+    parser.add_argument("--batch-size", type=int, default=5000, help="Batch size of the loss computation")
+    parser.add_argument("--repetitions", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Separate networks (two forward passes) and shared network (one forward pass)
+    policy_net = mlp(args.obs_size, args.hidden_sizes, ReLU, args.act_size, Identity)
+    value_net = mlp(args.obs_size, args.hidden_sizes, ReLU, 1, Identity)
+    shared_net = actor_critic_mlp(args.obs_size, args.hidden_sizes, ReLU, args.act_size, Identity)
+
+    observation = torch.randn(args.obs_size)
+    observations = torch.randn(args.batch_size, args.obs_size)
+
+    def act_separate():
+        with torch.no_grad():
+            return policy_net(observation), value_net(observation)
+
+    def act_shared():
+        with torch.no_grad():
+            return shared_net(observation)
+
+    def loss_separate():
+        logits, values = policy_net(observations), value_net(observations).squeeze(-1)
+        (logits.sum() + values.sum()).backward()
+
+    def loss_shared():
+        logits, values = shared_net(observations)
+        (logits.sum() + values.sum()).backward()
+
+    # Measure each configuration, reporting the time per call
+    for name, separate, shared, repetitions in (("act (batch 1)", act_separate, act_shared, args.repetitions),
+                                               ("loss (batch {})".format(args.batch_size), loss_separate,
+                                                loss_shared, args.repetitions // 10)):
+        separate_time = timeit.timeit(separate, number=repetitions) / repetitions
+        shared_time = timeit.timeit(shared, number=repetitions) / repetitions
+        print("{:<20} separate {:8.1f} us | shared {:8.1f} us ({:.2f}x)".format(
+            name, separate_time * 1e6, shared_time * 1e6, separate_time / shared_time))
+
+
+if __name__ == "__main__":
+    main()
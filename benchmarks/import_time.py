@@ -0,0 +1,104 @@
+# RL IMPLEMENTATIONS - IMPORT TIME BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Measures the startup cost of the most common entry points using "python -X importtime",
+# and checks it against a time budget. The script exits with an error if any budget is exceeded,
+# so it can be used as a check before launching actor processes
+
+# IMPORTS #
+import argparse
+import os
+import subprocess
+import sys
+
+# Entry points to measure, with their time budget (in milliseconds)
+# Entry points not requiring PyTorch or Gym must stay well below the cost of importing them
+IMPORT_BUDGETS = {
+    "import memories": 10.0,
+    "import utils": 10.0,
+    "import rl_methods": 10.0,
+    "import rl_methods.policy_gradient": 10.0,
+    "from memories import ReplayBuffer": 250.0,
+    "from utils import RunningMeanStd": 250.0,
+}
+
+
+def measure_import_time(statement, repetitions):
+    """
+    Measures the total import time of a statement in a fresh interpreter, as reported by "-X importtime".
+
+    The best time of all repetitions is returned, to reduce the noise introduced by the file system cache
+
+    Parameters
+    ----------
+    statement: str
+        Statement to be executed
+    repetitions: int
+        Number of fresh interpreters to launch
+
+    Returns
+    -------
+    float
+        Import time in milliseconds
+    """
+
+    # The repository root must be importable from the subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    best_time = float("inf")
+    for _ in range(repetitions):
+
+        # Measure the time of the imports triggered by the statement (the interpreter startup is measured
+        # separately, so only the imports after "-c" are counted)
+        baseline = _total_import_time([sys.executable, "-X", "importtime", "-c", "pass"], root)
+        total = _total_import_time([sys.executable, "-X", "importtime", "-c", statement], root)
+        best_time = min(best_time, max(total - baseline, 0.0))
+
+    return best_time
+
+
+def _total_import_time(command, cwd):
+    """
+    Runs a command with "-X importtime" and returns the sum of the self import times, in milliseconds
+
+    Parameters
+    ----------
+    command: list[str]
+    cwd: str
+
+    Returns
+    -------
+    float
+    """
+
+    result = subprocess.run(command, cwd=cwd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                            universal_newlines=True, check=True)
+
+    # Lines have the format "import time: <self us> | <cumulative us> | <module>"
+    total = 0
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            total += int(line.split(":", 1)[1].split("|")[0])
+
+    return total / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the import time of the common entry points")
+    parser.add_argument("--repetitions", type=int, default=5, help="Fresh interpreters launched per entry point")
+    args = parser.parse_args()
+
+    # Measure all entry points and check their budgets
+    exceeded = False
+    for statement, budget in IMPORT_BUDGETS.items():
+        import_time = measure_import_time(statement, args.repetitions)
+        status = "OK" if import_time <= budget else "OVER BUDGET"
+        exceeded = exceeded or import_time > budget
+        print("{:<40} {:>8.1f} ms (budget {:>6.1f} ms) {}".format(statement, import_time, budget, status))
+
+    sys.exit(1 if exceeded else 0)
+
+
+if __name__ == "__main__":
+    main()
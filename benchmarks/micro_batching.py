@@ -0,0 +1,107 @@
+# RL IMPLEMENTATIONS - MICRO-BATCHING BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Measures the peak memory (RSS) increase and the time of a single SimpleGradient update
+# with full-batch and micro-batched gradient computation, using flattened uint8 frames as observations.
+# Each configuration runs in a fresh process, so the peak RSS of one does not hide the others
+
+# IMPORTS #
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+
+def run_update(steps, obs_size, micro_batch_size, memory_budget, seed):
+    """
+    Fills the replay buffer of a SimpleGradient agent with synthetic frames and performs a single update
+
+    Parameters
+    ----------
+    steps: int
+    obs_size: int
+    micro_batch_size: int, optional
+    memory_budget: int, optional
+    seed: int
+
+    Returns
+    -------
+    dict
+        Peak RSS increase (MB), update time (s) and micro-batch size
+    """
+
+    import numpy as np
+    import torch
+    from gym.spaces import Box, Discrete
+    from torch.optim import Adam
+
+    from rl_methods import SimpleGradient
+
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+
+    # The agent only needs the spaces of the environment
+    env = SimpleNamespace(observation_space=Box(0, 255, (obs_size,), np.uint8), action_space=Discrete(4))
+    agent = SimpleGradient(env, micro_batch_size=micro_batch_size, update_memory_budget=memory_budget)
+
+    # Fill the replay buffer with episodes of 500 steps
+    frames = [rng.integers(0, 255, obs_size, dtype=np.uint8) for _ in range(steps + 1)]
+    for step in range(steps):
+        if step % 500 == 0:
+            agent.replay_buffer.finish_episode(False)
+            agent.replay_buffer.start_episode()
+        agent.replay_buffer.insert_experience(frames[step], int(rng.integers(4)), 1.0, frames[step + 1])
+    agent.replay_buffer.finish_episode(False)
+
+    # Measure the update, after a forward and backward pass initializing PyTorch (done once per process)
+    optimizer = Adam(agent.policy_net.parameters())
+    agent.policy_net(torch.zeros(32, obs_size)).sum().backward()
+    agent.policy_net.zero_grad(set_to_none=True)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    agent._update(optimizer)
+    update_time = time.perf_counter() - start_time
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {"peak_rss_mb": (rss_after - rss_before) / 1024, "time": update_time,
+            "micro_batch_size": agent._get_micro_batch_size(agent.replay_buffer.finished_length)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the peak memory of full-batch and micro-batched updates")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--obs-size", type=int, default=84 * 84)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--single", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Run a single configuration (within a fresh process)
+    if args.single is not None:
+        micro_batch_size, memory_budget = json.loads(args.single)
+        print(json.dumps(run_update(args.steps, args.obs_size, micro_batch_size, memory_budget, args.seed)))
+        return
+
+    configurations = (("full batch", None, None), ("micro-batch 1024", 1024, None),
+                      ("micro-batch 256", 256, None), ("budget 64 MB", None, 64 * 1024 * 1024))
+
+    results = {}
+    for name, micro_batch_size, memory_budget in configurations:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.micro_batching", "--steps", str(args.steps),
+                                 "--obs-size", str(args.obs_size), "--seed", str(args.seed),
+                                 "--single", json.dumps([micro_batch_size, memory_budget])],
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+
+    full_batch = results["full batch"]
+    for name, result in results.items():
+        print("{:<18} micro-batch {:>6} | peak RSS +{:8.1f} MB | update {:6.3f} s ({:.2f}x time)".format(
+            name, result["micro_batch_size"], result["peak_rss_mb"], result["time"],
+            result["time"] / full_batch["time"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# RL IMPLEMENTATIONS - PIPELINED ROLLOUTS BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Compares the wall-clock time per epoch of SimpleGradient when training serially
+# and when overlapping experience collection with network updates (pipelined mode)
+
+# IMPORTS #
+import argparse
+import time
+
+import gym
+import torch
+
+from rl_methods import SimpleGradient
+from utils import PolicyGradientLogger
+
+
+def measure_epoch_time(env_id, total_epochs, steps_per_epoch, pipelined, seed):
+    """
+    Trains a SimpleGradient agent and returns the mean wall-clock time per epoch, in seconds
+
+    Parameters
+    ----------
+    env_id: str
+    total_epochs: int
+    steps_per_epoch: int
+    pipelined: bool
+    seed: int
+
+    Returns
+    -------
+    float
+    """
+
+    torch.manual_seed(seed)
+    env = gym.make(env_id)
+    env.reset(seed=seed)
+
+    agent = SimpleGradient(env)
+
+    # A first epoch is trained to exclude the PyTorch initialization from the measurement
+    agent.train(1, steps_per_epoch, logger=PolicyGradientLogger(verbose=False))
+
+    start_time = time.perf_counter()
+    agent.train(total_epochs, steps_per_epoch, logger=PolicyGradientLogger(verbose=False), pipelined=pipelined)
+
+    return (time.perf_counter() - start_time) / total_epochs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares serial and pipelined training of SimpleGradient")
+    parser.add_argument("--env", default="CartPole-v1", help="Gym environment id")
+    parser.add_argument("--epochs", type=int, default=20, help="Epochs trained in each mode")
+    parser.add_argument("--steps", type=int, default=5000, help="Steps per epoch")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    serial_time = measure_epoch_time(args.env, args.epochs, args.steps, False, args.seed)
+    pipelined_time = measure_epoch_time(args.env, args.epochs, args.steps, True, args.seed)
+
+    print("Serial:    {:.4f} s / epoch".format(serial_time))
+    print("Pipelined: {:.4f} s / epoch ({:.2f}x)".format(pipelined_time, serial_time / pipelined_time))
+
+
+if __name__ == "__main__":
+    main()
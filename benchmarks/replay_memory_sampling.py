@@ -0,0 +1,69 @@
+# RL IMPLEMENTATIONS - REPLAY MEMORY SAMPLING BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Compares the cost of sampling 1-step and n-step batches from a full ReplayMemory
+
+# IMPORTS #
+import argparse
+import timeit
+
+import numpy as np
+
+from memories import ReplayMemory
+
+
+def fill_memory(capacity, obs_size, episode_length, seed):
+    """
+    Creates a ReplayMemory and fills it (wrapping around once) with random experiences
+
+    Parameters
+    ----------
+    capacity: int
+    obs_size: int
+    episode_length: int
+        Mean length of the episodes
+    seed: int
+
+    Returns
+    -------
+    ReplayMemory
+    """
+
+    rng = np.random.default_rng(seed)
+    memory = ReplayMemory(capacity, seed)
+
+    # Experiences are inserted through the public method, exceeding the capacity to force a wraparound
+    states = rng.standard_normal((1024, obs_size)).astype(np.float32)
+    for step in range(capacity + capacity // 4):
+        final = rng.random() < 1.0 / episode_length
+        memory.insert_experience(states[step % 1024], int(step % 4), float(rng.random()),
+                                 states[(step + 1) % 1024], final)
+
+    return memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares 1-step and n-step sampling from a ReplayMemory")
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--obs-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--repetitions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    memory = fill_memory(args.capacity, args.obs_size, 200, args.seed)
+
+    # Measure the time per sampled batch
+    one_step = timeit.timeit(lambda: memory.sample(args.batch_size), number=args.repetitions) / args.repetitions
+    print("1-step:  {:8.1f} us / batch".format(one_step * 1e6))
+
+    for n_steps in args.n_steps:
+        n_step = timeit.timeit(lambda: memory.sample_n_step(args.batch_size, n_steps, 0.99),
+                               number=args.repetitions) / args.repetitions
+        print("{}-step: {:8.1f} us / batch ({:.2f}x)".format(n_steps, n_step * 1e6, n_step / one_step))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# RL IMPLEMENTATIONS - TELEMETRY OVERHEAD BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Measures the overhead of the telemetry on the training time of SimpleGradient:
+#   * The cost of each step counter increment and of each background sample, relative to the step time
+#   * The epoch time with and without telemetry (interleaved, so drifts of the machine affect both equally)
+
+# IMPORTS #
+import argparse
+import statistics
+import time
+import timeit
+
+import gym
+import torch
+
+from rl_methods import SimpleGradient
+from utils import PolicyGradientLogger, Telemetry
+
+
+def measure_overhead(env_id, total_epochs, steps_per_epoch, interval, seed):
+    """
+    Trains a SimpleGradient agent alternating epochs with and without telemetry,
+    and returns the median time per epoch of both modes, in seconds
+
+    Parameters
+    ----------
+    env_id: str
+    total_epochs: int
+    steps_per_epoch: int
+    interval: float
+        Time between telemetry samples, in seconds
+    seed: int
+
+    Returns
+    -------
+    (float, float)
+        Median epoch time without and with telemetry
+    """
+
+    torch.manual_seed(seed)
+    env = gym.make(env_id)
+    env.reset(seed=seed)
+
+    agent = SimpleGradient(env)
+    telemetry = Telemetry(interval=interval, port=0)
+
+    # A first epoch is trained to exclude the PyTorch initialization from the measurement
+    agent.train(1, steps_per_epoch, logger=PolicyGradientLogger(verbose=False))
+
+    times = {False: [], True: []}
+    with telemetry:
+        for epoch in range(2 * total_epochs):
+            # Epochs alternate in ABBA order, so each mode is equally often the first and the second of a pair
+            enabled = epoch % 4 in (1, 2)
+            agent.telemetry = telemetry if enabled else None
+
+            start_time = time.perf_counter()
+            agent.train(1, steps_per_epoch, logger=PolicyGradientLogger(verbose=False))
+            times[enabled].append(time.perf_counter() - start_time)
+
+    return statistics.median(times[False]), statistics.median(times[True])
+
+
+def measure_costs(agent, telemetry, repetitions=100):
+    """
+    Measures the cost of a step counter increment and of a sample of the telemetry
+
+    Parameters
+    ----------
+    agent: SimpleGradient
+        Agent whose replay buffer is watched during the sample
+    telemetry: Telemetry
+    repetitions: int
+
+    Returns
+    -------
+    (float, float)
+        Seconds per counter increment and per sample
+    """
+
+    telemetry.watch_memory("replay_buffer", lambda: agent.replay_buffer)
+    counter_cost = timeit.timeit(telemetry.count_steps, number=100000) / 100000
+    sample_cost = timeit.timeit(telemetry.sample, number=repetitions) / repetitions
+
+    return counter_cost, sample_cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the overhead of the telemetry on SimpleGradient")
+    parser.add_argument("--env", default="CartPole-v1", help="Gym environment id")
+    parser.add_argument("--epochs", type=int, default=20, help="Epochs trained in each mode")
+    parser.add_argument("--steps", type=int, default=5000, help="Steps per epoch")
+    parser.add_argument("--interval", type=float, default=1.0, help="Time between telemetry samples")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base_time, telemetry_time = measure_overhead(args.env, args.epochs, args.steps, args.interval, args.seed)
+
+    # Costs of the telemetry operations, measured with a filled replay buffer
+    agent = SimpleGradient(gym.make(args.env))
+    agent._epoch(args.steps)
+    counter_cost, sample_cost = measure_costs(agent, Telemetry(interval=args.interval))
+    step_time = base_time / args.steps
+    overhead = counter_cost / step_time + sample_cost / args.interval
+
+    print("Counter increment: {:.0f} ns ({:.3f}% of the step time)".format(1e9 * counter_cost,
+                                                                          100 * counter_cost / step_time))
+    print("Sample:            {:.0f} us ({:.4f}% of the time at one sample every {} s)".format(
+        1e6 * sample_cost, 100 * sample_cost / args.interval, args.interval))
+    print("Expected overhead: {:.3f}%".format(100 * overhead))
+    print("Without telemetry: {:.4f} s / epoch".format(base_time))
+    print("With telemetry:    {:.4f} s / epoch ({:+.2f}%)".format(telemetry_time,
+                                                                  100 * (telemetry_time / base_time - 1)))
+
+
+if __name__ == "__main__":
+    main()
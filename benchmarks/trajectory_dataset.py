@@ -0,0 +1,117 @@
+# RL IMPLEMENTATIONS - TRAJECTORY DATASET BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Measures the write and read throughput (MB/s of raw experience data) of the trajectory datasets,
+# for vector observations and uint8 frames, with and without compression
+
+# IMPORTS #
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from memories import TransitionBatch, TrajectoryWriter, TrajectoryDataset
+
+
+def make_episode(rng, length, obs_shape, frames):
+    """
+    Creates a synthetic episode. Frames contain a moving square over a black background,
+    which compresses similarly to simple Atari frames
+
+    Parameters
+    ----------
+    rng: np.random.Generator
+    length: int
+    obs_shape: tuple[int, ...]
+    frames: bool
+
+    Returns
+    -------
+    TransitionBatch
+    """
+
+    if frames:
+        states = np.zeros((length + 1,) + obs_shape, dtype=np.uint8)
+        for step in range(length + 1):
+            row, column = (step * 3) % (obs_shape[0] - 8), (step * 5) % (obs_shape[1] - 8)
+            states[step, row:row + 8, column:column + 8] = 255
+    else:
+        states = rng.standard_normal((length + 1,) + obs_shape).astype(np.float32)
+
+    final_flags = np.zeros(length, dtype=bool)
+    final_flags[-1] = True
+
+    return TransitionBatch(states[:-1], rng.integers(0, 4, length), rng.random(length, dtype=np.float32),
+                           states[1:], final_flags)
+
+
+def measure(obs_shape, frames, compression, episodes, length, seed):
+    """
+    Writes and reads back (with random access) a synthetic dataset, returning the write and read throughput in MB/s
+
+    Parameters
+    ----------
+    obs_shape: tuple[int, ...]
+    frames: bool
+    compression: str
+    episodes: int
+    length: int
+    seed: int
+
+    Returns
+    -------
+    (float, float, float)
+        Write throughput, read throughput and compression ratio
+    """
+
+    rng = np.random.default_rng(seed)
+    batches = [make_episode(rng, length, obs_shape, frames) for _ in range(episodes)]
+    raw_bytes = sum(getattr(batch, field).nbytes for batch in batches for field in TransitionBatch.__slots__)
+
+    directory = tempfile.mkdtemp()
+    try:
+        # Write all episodes
+        start_time = time.perf_counter()
+        writer = TrajectoryWriter(directory, shard_size=20 * length, compression=compression)
+        for batch in batches:
+            writer.append_episode(batch)
+        writer.close()
+        write_time = time.perf_counter() - start_time
+
+        disk_bytes = sum(os.path.getsize(os.path.join(root, name))
+                         for root, _, names in os.walk(directory) for name in names)
+
+        # Read all episodes back in random order, copying them into memory
+        start_time = time.perf_counter()
+        dataset = TrajectoryDataset(directory)
+        for episode in rng.permutation(len(dataset)):
+            batch = dataset[int(episode)]
+            for field in TransitionBatch.__slots__:
+                np.array(getattr(batch, field))
+        read_time = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(directory)
+
+    return raw_bytes / write_time / 1e6, raw_bytes / read_time / 1e6, raw_bytes / disk_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the throughput of the trajectory datasets")
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--length", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, obs_shape, frames in (("vector (4,)", (4,), False), ("frames (84, 84)", (84, 84), True)):
+        for compression in ("none", "deflate"):
+            write, read, ratio = measure(obs_shape, frames, compression, args.episodes, args.length, args.seed)
+            print("{:<16} {:<8} write {:8.1f} MB/s | read {:8.1f} MB/s | ratio {:6.1f}x".format(
+                name, compression, write, read, ratio))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# RL IMPLEMENTATIONS - TRANSITION BATCH BENCHMARK
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Measures the memory of slotted Experiences (against the same class with a __dict__) and the time and memory
+# of the batched operations of TransitionBatch, on CartPole-sized transitions (4 float32 observations)
+
+# IMPORTS #
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from memories import Experience, TransitionBatch, unpack_experiences
+
+
+class DictExperience:
+    """
+    Experience storing its elements in a per-instance dictionary (the layout before __slots__)
+    """
+
+    def __init__(self, state, action, reward, next_state, final):
+        self.state = state
+        self.action = action
+        self.reward = reward
+        self.next_state = next_state
+        self.final = final
+
+
+def measure_time(function):
+    """
+    Measures the time of a function
+
+    Parameters
+    ----------
+    function: Callable
+
+    Returns
+    -------
+    (Any, float)
+        Result and time (s)
+    """
+
+    start_time = time.perf_counter()
+    result = function()
+
+    return result, time.perf_counter() - start_time
+
+
+def measure_memory(function):
+    """
+    Measures the memory allocated by a function and still alive when it returns. The memory is traced
+    separately from the time measurements, since tracing slows down all allocations
+
+    Parameters
+    ----------
+    function: Callable
+
+    Returns
+    -------
+    float
+        Allocated memory (MB)
+    """
+
+    tracemalloc.start()
+    result = function()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+
+    return allocated / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures Experience and TransitionBatch on CartPole-sized data")
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Observations are shared between consecutive experiences, as stored by the agents
+    rng = np.random.default_rng(args.seed)
+    observations = list(rng.standard_normal((args.transitions + 1, 4)).astype(np.float32))
+    actions = rng.integers(0, 2, args.transitions).tolist()
+    rewards = [1.0] * args.transitions
+
+    def create(experience_class):
+        return [experience_class(observations[i], actions[i], rewards[i], observations[i + 1], False)
+                for i in range(args.transitions)]
+
+    dict_memory = measure_memory(lambda: create(DictExperience))
+    slots_memory = measure_memory(lambda: create(Experience))
+    print("Experience objects:  {:7.1f} MB with __dict__ | {:7.1f} MB with __slots__".format(dict_memory, slots_memory))
+
+    experiences = create(Experience)
+    lists, unpack_time = measure_time(lambda: unpack_experiences(experiences))
+    print("unpack_experiences:  {:7.3f} s".format(unpack_time))
+
+    batch, from_lists_time = measure_time(lambda: TransitionBatch.from_lists(*lists))
+    print("from_lists:          {:7.3f} s  | {:7.1f} MB for all five arrays".format(
+        from_lists_time, measure_memory(lambda: TransitionBatch.from_lists(*lists))))
+
+    _, from_arrays_time = measure_time(lambda: TransitionBatch.from_arrays(*batch.as_tuple()))
+    print("from_arrays:         {:7.3f} ms | {:7.3f} MB (no copies)".format(
+        1e3 * from_arrays_time, measure_memory(lambda: TransitionBatch.from_arrays(*batch.as_tuple()))))
+
+    _, concatenate_time = measure_time(lambda: TransitionBatch.concatenate([batch, batch]))
+    print("concatenate (2x):    {:7.3f} s".format(concatenate_time))
+
+    # PyTorch is imported before the measurement, so only the conversion is measured
+    import torch  # noqa: F401
+    _, to_time = measure_time(lambda: batch.to("cpu"))
+    print("to('cpu'):           {:7.3f} ms (the arrays are shared, not copied)".format(1e3 * to_time))
+
+
+if __name__ == "__main__":
+    main()
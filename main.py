@@ -1,17 +1,59 @@
-import gym
-import torch.nn as nn
-from rl_methods import mlp
+# RL IMPLEMENTATIONS - MAIN
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Command line entry point, used to train the implemented algorithms from configuration files:
+#   python main.py train config.yaml [--output-dir DIR] [--cpus N]
+#   python main.py pbt config.yaml [--output-dir DIR] [--cpus N]
+#
+# Each configuration may contain several variants and seeds, which are run concurrently
+# within the node (see utils.experiments for the configuration format).
+# Configurations with a "population" section can be trained with Population Based Training (see utils.population)
 
-# CURRENTLY TESTING
-# Create a NN and check that it was created properly
+# IMPORTS #
+import argparse
+import sys
 
+from utils.experiments import load_config, schedule_runs
 
-env = gym.make("ALE/Pong-v5")
-print(env.observation_space.shape)
-print(env.action_space)
-print(env.action_space.n)
 
-env = gym.make("HalfCheetah-v2")
-print(env.observation_space.shape)
-print(env.action_space)
-print(env.action_space.shape)
\ No newline at end of file
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trains RL algorithms from configuration files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Train command
+    train_parser = subparsers.add_parser("train", help="Trains all runs defined in a configuration file")
+    train_parser.add_argument("config", help="Configuration file (JSON or YAML)")
+    train_parser.add_argument("--output-dir", default=None, help="Overrides the output directory of the configuration")
+    train_parser.add_argument("--cpus", type=int, default=None, help="Total CPU cores available for all runs")
+
+    # Population Based Training command
+    pbt_parser = subparsers.add_parser("pbt", help="Trains a population of workers with Population Based Training")
+    pbt_parser.add_argument("config", help="Configuration file (JSON or YAML) with a population section")
+    pbt_parser.add_argument("--output-dir", default=None, help="Overrides the output directory of the configuration")
+    pbt_parser.add_argument("--cpus", type=int, default=None, help="Total CPU cores available for all workers")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        exit_codes = schedule_runs(load_config(args.config), args.cpus, args.output_dir)
+
+        # Fail if any of the runs failed
+        return 1 if any(exit_codes.values()) else 0
+
+    if args.command == "pbt":
+        # Imported here, so the rest of commands do not import NumPy at startup
+        from utils.population import run_population
+
+        # Fail if any of the workers failed
+        try:
+            run_population(load_config(args.config), args.cpus, args.output_dir)
+        except RuntimeError as error:
+            print("Population Based Training failed: {}".format(error), file=sys.stderr)
+            return 1
+
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,29 @@ This module implements the most typical memory structures used by RL algorithms:
       after each epoch.
     * ReplayMemory and its variants implement a memory for off-policy methods (such as value methods),
       that continually store past experiences
+    * TrajectoryWriter and TrajectoryDataset store finished episodes on disk (as NPZ shards) and read them back
+      lazily, for offline analysis or to warm-start off-policy methods
+
+All classes are imported lazily when first accessed, and this module never imports PyTorch or Gym
 """
 
 # IMPORTS
-from .experience import Experience, unpack_experiences
-from .replay_buffer import Episode, ReplayBuffer
+from utils.lazy_imports import lazy_attributes
+
+# Lazily imported attributes, mapped to the submodule defining them
+_LAZY_ATTRIBUTES = {
+    "Experience": ".experience",
+    "TransitionBatch": ".experience",
+    "unpack_experiences": ".experience",
+    "ColumnView": ".storage",
+    "ExperienceStorage": ".storage",
+    "Episode": ".replay_buffer",
+    "ReplayBuffer": ".replay_buffer",
+    "ReplayMemory": ".replay_memory",
+    "TrajectoryWriter": ".trajectory_dataset",
+    "TrajectoryDataset": ".trajectory_dataset",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
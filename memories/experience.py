@@ -6,8 +6,11 @@
 # Experience to be re-used by all memory structures in RL algorithms
 
 # IMPORTS #
+from numbers import Integral
 from typing import Any, Union, Tuple
 
+import numpy as np
+
 
 class Experience:
     """
@@ -34,6 +37,9 @@ class Experience:
         Final flag
     """
 
+    # Experiences are stored without a per-instance dictionary, to reduce their memory footprint
+    __slots__ = ("state", "action", "reward", "next_state", "final")
+
     # ATTRIBUTES #
     # Initial state s
     state: Any
@@ -56,6 +62,235 @@ class Experience:
         self.next_state = next_state
         self.final = final
 
+    def __repr__(self):
+        return "Experience(state={}, action={}, reward={}, next_state={}, final={})".format(
+            self.state, self.action, self.reward, self.next_state, self.final)
+
+
+class TransitionBatch:
+    """
+    A TransitionBatch stores a batch of experiences as a structure of arrays: each element of the
+    experiences (s, a, r, s', f) is stored as a single array, with the batch along the first axis.
+
+    Batches can be concatenated, indexed (with integers, slices or index arrays) and moved as a whole
+    into a PyTorch device. Before being moved, all elements are NumPy arrays
+
+    Parameters
+    ----------
+    states: np.ndarray or torch.Tensor
+        Initial states
+    actions: np.ndarray or torch.Tensor
+        Actions performed
+    rewards: np.ndarray or torch.Tensor
+        Rewards obtained
+    next_states: np.ndarray or torch.Tensor
+        States reached
+    final_flags: np.ndarray or torch.Tensor
+        Final flags
+    """
+
+    __slots__ = ("states", "actions", "rewards", "next_states", "final_flags")
+
+    # ATTRIBUTES #
+    # Initial states s
+    states: Any
+    # Chosen actions a
+    actions: Any
+    # Rewards obtained r
+    rewards: Any
+    # Reached states s'
+    next_states: Any
+    # Final flags f
+    final_flags: Any
+
+    # CONSTRUCTOR #
+    def __init__(self, states, actions, rewards, next_states, final_flags):
+
+        # Store the arrays as they are (no copies are performed)
+        self.states = states
+        self.actions = actions
+        self.rewards = rewards
+        self.next_states = next_states
+        self.final_flags = final_flags
+
+    # BATCHED CONSTRUCTORS #
+    @classmethod
+    def from_lists(cls, states, actions, rewards, next_states, final_flags):
+        """
+        Creates a batch from five sequences (lists, column views...) of experience elements.
+
+        States keep their original data type (so image observations stay as uint8), rewards are
+        stored as float32 and final flags as booleans. Elements specified as None are kept as None
+        (for example, the elements that are not needed by a loss)
+
+        Parameters
+        ----------
+        states: Sequence[Any]
+        actions: Sequence[int or tuple]
+        rewards: Sequence[float]
+        next_states: Sequence[Any]
+        final_flags: Sequence[bool]
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        def convert(values, dtype=None):
+            return None if values is None else np.asarray(values, dtype=dtype)
+
+        return cls(convert(states), convert(actions), convert(rewards, np.float32),
+                   convert(next_states), convert(final_flags, bool))
+
+    @classmethod
+    def from_arrays(cls, states, actions, rewards, next_states, final_flags):
+        """
+        Creates a batch from five existing NumPy arrays (for example, the columns of a memory or a dataset).
+
+        Unlike from_lists, the arrays are never stacked: states and actions are kept as they are, and rewards
+        and final flags are only converted (copied) if their type is not float32 / bool.
+        The arrays must describe the same amount of experiences
+
+        Parameters
+        ----------
+        states: np.ndarray
+        actions: np.ndarray
+        rewards: np.ndarray
+        next_states: np.ndarray
+        final_flags: np.ndarray
+
+        Returns
+        -------
+        TransitionBatch
+
+        Raises
+        ------
+        ValueError
+            If the arrays have different lengths
+        """
+
+        lengths = {len(array) for array in (states, actions, rewards, next_states, final_flags)}
+        if len(lengths) > 1:
+            raise ValueError("All arrays of a batch must have the same length, got {}".format(sorted(lengths)))
+
+        return cls(states, actions, rewards.astype(np.float32, copy=False), next_states,
+                   final_flags.astype(bool, copy=False))
+
+    @classmethod
+    def from_experiences(cls, experience_list):
+        """
+        Creates a batch from a list of Experiences
+
+        Parameters
+        ----------
+        experience_list: list[Experience]
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        return cls.from_lists(*unpack_experiences(experience_list))
+
+    @classmethod
+    def concatenate(cls, batches):
+        """
+        Concatenates several batches (all of them either NumPy or PyTorch based) into a single batch.
+        Elements that are None (in the first batch) are kept as None
+
+        Parameters
+        ----------
+        batches: list[TransitionBatch]
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        # Choose the concatenation function depending on the array type of the first element that is present
+        if isinstance(batches[0]._first_element(), np.ndarray):
+            concatenate = np.concatenate
+        else:
+            import torch
+            concatenate = torch.cat
+
+        def concatenate_element(field):
+            if getattr(batches[0], field) is None:
+                return None
+            return concatenate([getattr(batch, field) for batch in batches])
+
+        return cls(*(concatenate_element(field) for field in cls.__slots__))
+
+    # METHODS #
+    def __len__(self):
+        element = self._first_element()
+        return 0 if element is None else len(element)
+
+    def __getitem__(self, index):
+
+        # Integer indices (including NumPy integers) keep the batch dimension, so the result is always a batch
+        if isinstance(index, Integral):
+            index = int(index)
+            index = slice(index, index + 1 if index != -1 else None)
+
+        # Elements that are None are kept as None
+        return TransitionBatch(*(None if getattr(self, field) is None else getattr(self, field)[index]
+                                 for field in self.__slots__))
+
+    def __repr__(self):
+        return "TransitionBatch(size={})".format(len(self))
+
+    def as_tuple(self):
+        """
+        Returns the elements of the batch as a tuple (states, actions, rewards, next_states, final_flags)
+
+        Returns
+        -------
+        tuple
+        """
+
+        return self.states, self.actions, self.rewards, self.next_states, self.final_flags
+
+    def to(self, device):
+        """
+        Returns a copy of the batch with all elements converted to PyTorch tensors in the specified device.
+
+        Floating point states are converted to float32, while integer states (images) keep their type,
+        to be converted once they are within the device. Elements that are None are kept as None
+
+        Parameters
+        ----------
+        device: str or torch.device
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        # PyTorch is only imported if it is actually needed
+        import torch
+
+        def convert(array):
+            if array is None:
+                return None
+            if isinstance(array, np.ndarray) and array.dtype == np.float64:
+                array = array.astype(np.float32)
+            return torch.as_tensor(array, device=device)
+
+        return TransitionBatch(*(convert(getattr(self, field)) for field in self.__slots__))
+
+    # HELPER METHODS #
+    def _first_element(self):
+        """
+        Returns the first element of the batch that is not None (None if all of them are None)
+
+        Returns
+        -------
+        np.ndarray or Tensor or None
+        """
+
+        return next((element for element in self.as_tuple() if element is not None), None)
+
 
 # STATIC METHODS
 
@@ -78,19 +313,11 @@ def unpack_experiences(experience_list):
     (list[Any], list[int or tuple], list[float], list[Any], list[bool])
     """
 
-    # Create lists to store the unpacked experiences
-    states = []
-    actions = []
-    rewards = []
-    next_states = []
-    final_flags = []
-
-    # Unpack each experience
-    for experience in experience_list:
-        states.append(experience.state)
-        actions.append(experience.action)
-        rewards.append(experience.reward)
-        next_states.append(experience.next_state)
-        final_flags.append(experience.final)
+    # Each list is built with a single comprehension over the experiences
+    states = [experience.state for experience in experience_list]
+    actions = [experience.action for experience in experience_list]
+    rewards = [experience.reward for experience in experience_list]
+    next_states = [experience.next_state for experience in experience_list]
+    final_flags = [experience.final for experience in experience_list]
 
     return states, actions, rewards, next_states, final_flags
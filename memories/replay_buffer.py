@@ -9,9 +9,14 @@
 
 
 # IMPORTS #
-from typing import List, Any, Tuple, Union, Optional
+from itertools import accumulate
+from typing import List, Optional, TYPE_CHECKING
 
-from memories import Experience, unpack_experiences
+from memories import Experience, TransitionBatch
+from memories.storage import ColumnView, ExperienceStorage
+
+if TYPE_CHECKING:
+    from memories.trajectory_dataset import TrajectoryWriter
 
 
 # EPISODE #
@@ -19,70 +24,172 @@ class Episode:
     """
     An Episode represents a complete episode performed by an agent in a RL environment
 
-    To be more precise, an Episode contains all Experiences performed from the Episode start to the
-    Episode end, and several helper methods to extract and manage info related to said experiences.
+    To be more precise, an Episode is a lightweight view over the range of a (shared) columnar ExperienceStorage
+    containing all Experiences performed from the Episode start to the Episode end, and several helper methods
+    to extract and manage info related to said experiences.
+
+    Per-element access (states, actions...) returns views over the storage and does not copy any element.
+    Derived values (episode reward and rewards-to-go) are computed lazily and cached until the episode changes
+
+    Parameters
+    ----------
+    storage: ExperienceStorage, optional
+        Storage where the experiences of the episode are appended. If not specified, the episode
+        creates its own storage
 
     Attributes
     ----------
-    experiences: list[Experience]
-        Current list of experiences within the episode
+    storage: ExperienceStorage
+        Columnar storage containing the experiences of the episode
+    start: int
+        Index of the first experience of the episode within the storage
     finished: bool
         Whether this episode is "complete" or not
-    states: list[Any]
-        List of current states s (after episode completion)
-    actions: list[int or tuple]
-        List of actions a (after episode completion)
-    rewards: list[float]
-        List of rewards r (after episode completion)
-    next_states: list[Any]
-        List of next states s' (after episode completion)
-    final_flags: list[bool]
-        List of final flags f (after episode completion)
+    truncated: bool
+        Whether the episode was cut off (by a time limit or the end of an epoch) before reaching a final state
+    continued: bool
+        Whether the episode was cut off by the end of an epoch, and is continued (as a new episode) by the next one
+    bootstrap_value: float
+        Estimated return after the last experience of a truncated episode (0 for terminated episodes)
+    experiences: list[Experience]
+        List of experiences within the episode (built on demand)
+    states: ColumnView
+        View of the states s
+    actions: ColumnView
+        View of the actions a
+    rewards: ColumnView
+        View of the rewards r
+    next_states: ColumnView
+        View of the next states s'
+    final_flags: ColumnView
+        View of the final flags f
     episode_reward: list[float]
-        Total reward obtained by this episode / trajectory
+        Total reward obtained by this episode / trajectory, repeated for all experiences
     rewards_to_go: List[float]
         Rewards to go for each experience within the episode
     """
 
     # ATTRIBUTES #
 
-    # Current list of experiences within the episode
-    experiences: List[Experience]
+    # Columnar storage containing the experiences of the episode
+    storage: ExperienceStorage
+    # Index of the first experience of the episode within the storage
+    start: int
+    # Index after the last experience of the episode (None while the episode is being filled)
+    _stop: Optional[int]
     # Whether this episode is "complete" or not
     finished: bool
+    # Whether the episode was cut off before reaching a final state
+    truncated: bool
+    # Whether the episode is continued by the next epoch
+    continued: bool
+    # Estimated return after the last experience of a truncated episode
+    bootstrap_value: float
 
-    # List of current states s (after episode completion)
-    states: List[Any]
-    # List of actions a (after episode completion)
-    actions: List[Union[int, Tuple]]
-    # List of rewards r (after episode completion)
-    rewards: List[float]
-    # List of next states s' (after episode completion)
-    next_states: List[Any]
-    # List of final flags f (after episode completion)
-    final_flags: List[bool]
-    # Total reward obtained by this episode / trajectory, repeated for all experiences
-    episode_reward: List[float]
-    # Rewards to go for each experience within the episode
-    rewards_to_go: List[float]
+    # Cached derived values (None if they need to be recomputed)
+    _episode_reward: Optional[List[float]]
+    _rewards_to_go: Optional[List[float]]
 
     # CONSTRUCTOR #
-    def __init__(self):
+    def __init__(self, storage=None):
+
+        # The episode starts at the end of the storage
+        self.storage = storage if storage is not None else ExperienceStorage()
+        self.start = len(self.storage)
+        self._stop = None
 
         # Episodes start empty and unfinished
-        self.experiences = []
         self.finished = False
+        self.truncated = False
+        self.continued = False
+        self.bootstrap_value = 0.0
+
+        # Derived values are computed when they are first requested
+        self._invalidate()
+
+    # PROPERTIES #
+    @property
+    def stop(self):
+        """
+        Index after the last experience of the episode within the storage
+
+        Returns
+        -------
+        int
+        """
+
+        # Unfinished episodes always span until the end of the storage
+        return self._stop if self._stop is not None else len(self.storage)
+
+    @property
+    def states(self):
+        return ColumnView(self.storage.states, self.start, self.stop)
+
+    @property
+    def actions(self):
+        return ColumnView(self.storage.actions, self.start, self.stop)
+
+    @property
+    def rewards(self):
+        return ColumnView(self.storage.rewards, self.start, self.stop)
+
+    @property
+    def next_states(self):
+        return ColumnView(self.storage.next_states, self.start, self.stop)
+
+    @property
+    def final_flags(self):
+        return ColumnView(self.storage.final_flags, self.start, self.stop)
+
+    @property
+    def experiences(self):
+        """
+        List of experiences of the episode. The Experiences are built on demand from the storage
+
+        Returns
+        -------
+        list[Experience]
+        """
+
+        return [Experience(*experience) for experience in
+                zip(self.states, self.actions, self.rewards, self.next_states, self.final_flags)]
+
+    @property
+    def episode_reward(self):
+        """
+        Total reward obtained by this episode / trajectory, repeated for all experiences.
+        Truncated episodes include their bootstrap value
+
+        Returns
+        -------
+        list[float]
+        """
+
+        if self._episode_reward is None:
+            self._episode_reward = [sum(self.rewards) + self.bootstrap_value] * len(self)
+
+        return self._episode_reward
+
+    @property
+    def rewards_to_go(self):
+        """
+        Rewards to go for each experience within the episode.
+        Truncated episodes include their bootstrap value
+
+        Returns
+        -------
+        list[float]
+        """
+
+        # Rewards to go are the reversed cumulative sum of the reversed rewards, starting from the bootstrap value
+        if self._rewards_to_go is None:
+            self._rewards_to_go = list(accumulate(reversed(self.rewards), initial=self.bootstrap_value))[:0:-1]
 
-        # The unrolled lists of experiences, general reward and reward-to-go are computed after the episode ends
-        self.states = []
-        self.actions = []
-        self.rewards = []
-        self.next_states = []
-        self.final_flags = []
-        self.episode_reward = []
-        self.rewards_to_go = []
+        return self._rewards_to_go
 
     # METHODS #
+    def __len__(self):
+        return self.stop - self.start
 
     def insert_experience(self, state, action, reward, next_state):
         """
@@ -100,40 +207,67 @@ class Episode:
             Next state s' reached after applying action a to state s
         """
 
-        # Create and append a new experience
-        experience = Experience(state, action, reward, next_state, False)
-        self.experiences.append(experience)
+        # Append a new experience to the end of the storage
+        self.storage.append(state, action, reward, next_state, False)
+        self._invalidate()
 
-    def finish_episode(self, completed):
+    def finish_episode(self, completed, continued=False):
         """
-        Marks the episode as finished and computes:
-            * The unrolled lists for each episode element
-            * The episode reward
-            * The rewards-to-go of each episode
+        Marks the episode as finished, fixing its range within the storage.
+
+        Episodes cut short are flagged as truncated, and their bootstrap value can be set afterwards
+        (see set_bootstrap_value). The episode reward and the rewards-to-go are computed lazily when requested
 
         Parameters
         ----------
         completed: bool
             Whether the final experience was final (True) or the episode was cut short (False)
+        continued: bool
+            Whether the episode was cut short by the end of the epoch, and is continued by the next epoch
         """
 
-        # Mark the episode as finished
+        # Mark the episode as finished and fix its range
         self.finished = True
+        self.truncated = not completed
+        self.continued = continued and not completed
+        self._stop = len(self.storage)
 
         # If specified, mark the last experience as a final experience
-        if completed:
-            self.experiences[-1].final = True
+        if completed and len(self) > 0:
+            self.storage.final_flags[self._stop - 1] = True
 
-        # Unfold the experiences
-        self.states, self.actions, self.rewards, self.next_states, self.final_flags = unpack_experiences(self.experiences)
+        self._invalidate()
 
-        # Compute the complete episode reward
-        self.episode_reward = [sum(self.rewards)] * len(self.rewards)
+    def set_bootstrap_value(self, value):
+        """
+        Sets the estimated return after the last experience of a truncated episode
 
-        # Compute the reward-to-go for each experience
-        for i in range(len(self.rewards)):
-            reward_to_go = sum(self.rewards[i:])
-            self.rewards_to_go.append(reward_to_go)
+        Parameters
+        ----------
+        value: float
+        """
+
+        self.bootstrap_value = float(value)
+        self._invalidate()
+
+    def to_batch(self):
+        """
+        Returns all the experiences of the episode as a TransitionBatch
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        return TransitionBatch.from_lists(self.states, self.actions, self.rewards, self.next_states, self.final_flags)
+
+    def _invalidate(self):
+        """
+        Clears the cached derived values, so they are recomputed the next time they are requested
+        """
+
+        self._episode_reward = None
+        self._rewards_to_go = None
 
 
 # REPLAY BUFFER
@@ -145,20 +279,35 @@ class ReplayBuffer:
     Unlike Replay Memory (used by value-based methods such as DQN), Replay Buffers work on-policy, by storing
     experiences performed with the current policy and being flushed after use.
 
+    All episodes share a single columnar ExperienceStorage, so each experience is stored only once.
+    The buffer-wide lists are views over the storage, covering only the finished episodes.
+
+    Optionally, finished episodes can also be streamed into a TrajectoryWriter, so they are kept
+    after the buffer is flushed
+
+    Parameters
+    ----------
+    episode_writer: TrajectoryWriter, optional
+        If specified, each finished episode is appended to this writer
+
+    Attributes
+    ----------
     current_episode: Episode, optional
         Current episode. If None, there is no currently started episode
     episode_list: List[Episode]
         List of all episodes, not including the current episode
-    states: list[Any]
-        List of current states s of ALL episodes
-    actions: list[int or tuple]
-        List of actions a of ALL episodes
-    rewards: list[float]
-        List of rewards r of ALL episodes
-    next_states: list[Any]
-        List of next states s' of ALL episodes
-    final_flags: list[bool]
-        List of final flags f of ALL episodes
+    storage: ExperienceStorage
+        Columnar storage shared by all episodes
+    states: ColumnView
+        View of the current states s of ALL episodes
+    actions: ColumnView
+        View of the actions a of ALL episodes
+    rewards: ColumnView
+        View of the rewards r of ALL episodes
+    next_states: ColumnView
+        View of the next states s' of ALL episodes
+    final_flags: ColumnView
+        View of the final flags f of ALL episodes
     episode_reward: list[float]
         Total reward for each episode, for ALL episodes
         Note: experiences of the same episode have the same reward
@@ -172,38 +321,79 @@ class ReplayBuffer:
     current_episode: Optional[Episode]
     # List of all episodes, not including the current episode
     episode_list: List[Episode]
+    # Columnar storage shared by all episodes
+    storage: ExperienceStorage
+    # Writer where the finished episodes are streamed. If None, episodes are not stored
+    episode_writer: Optional["TrajectoryWriter"]
 
-    # List of current states s of ALL episodes
-    states: List[Any]
-    # List of actions a of ALL episodes
-    actions: List[Union[int, Tuple]]
-    # List of rewards r of ALL episodes
-    rewards: List[float]
-    # List of next states s' of ALL episodes
-    next_states: List[Any]
-    # List of final flags f of ALL episodes
-    final_flags: List[bool]
-    # Total reward for each episode, for ALL episodes
-    # Note: experiences of the same episode have the same reward
-    episode_reward: List[float]
-    # Rewards to go for each experience within the episode, for ALL episodes
-    rewards_to_go: List[float]
+    # Cached derived values for ALL episodes (None if they need to be recomputed)
+    _episode_reward: Optional[List[float]]
+    _rewards_to_go: Optional[List[float]]
 
     # CONSTRUCTOR #
-    def __init__(self):
+    def __init__(self, episode_writer=None):
 
-        # The Replay Buffer starts without a current episode
-        self.current_episode = None
+        self.episode_writer = episode_writer
 
-        # All lists start empty
-        self.episode_list = []
-        self.states = []
-        self.actions = []
-        self.rewards = []
-        self.next_states = []
-        self.final_flags = []
-        self.episode_reward = []
-        self.rewards_to_go = []
+        # The Replay Buffer starts empty
+        self.empty()
+
+    # PROPERTIES #
+    @property
+    def finished_length(self):
+        """
+        Amount of experiences belonging to finished episodes
+
+        Returns
+        -------
+        int
+        """
+
+        return self.episode_list[-1].stop if self.episode_list else 0
+
+    @property
+    def states(self):
+        return ColumnView(self.storage.states, 0, self.finished_length)
+
+    @property
+    def actions(self):
+        return ColumnView(self.storage.actions, 0, self.finished_length)
+
+    @property
+    def rewards(self):
+        return ColumnView(self.storage.rewards, 0, self.finished_length)
+
+    @property
+    def next_states(self):
+        return ColumnView(self.storage.next_states, 0, self.finished_length)
+
+    @property
+    def final_flags(self):
+        return ColumnView(self.storage.final_flags, 0, self.finished_length)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by all stored experiences (including the current episode), in bytes
+
+        Returns
+        -------
+        int
+        """
+
+        return self.storage.nbytes
+
+    @property
+    def episode_reward(self):
+        if self._episode_reward is None:
+            self._episode_reward = [reward for episode in self.episode_list for reward in episode.episode_reward]
+        return self._episode_reward
+
+    @property
+    def rewards_to_go(self):
+        if self._rewards_to_go is None:
+            self._rewards_to_go = [reward for episode in self.episode_list for reward in episode.rewards_to_go]
+        return self._rewards_to_go
 
     # METHODS #
 
@@ -214,42 +404,77 @@ class ReplayBuffer:
         """
 
         # Ignore this method if an episode already exists
-        if not self.current_episode:
-            self.current_episode = Episode()
+        if self.current_episode is None:
+            self.current_episode = Episode(self.storage)
 
-    def finish_episode(self, completed):
+    def finish_episode(self, completed, continued=False):
         """
-        Finishes the episode, removing it as the current episode and storing the episode values
-        within the buffer for faster usage
+        Finishes the episode, removing it as the current episode and storing it within the buffer
 
         If the episode has been "cut out" (the episode is not actually finished but the training process stops
-        earlier due to cut off), the final experience is not marked as final
+        earlier due to cut off), the final experience is not marked as final and the episode is flagged as truncated.
+
+        Empty episodes are discarded
 
         Parameters
         ----------
         completed: bool
             True if the episode has finished naturally, False otherwise
+        continued: bool
+            True if the episode was cut off by the end of the epoch, and is continued by the next epoch
         """
 
         # Ignore this method if there is no current episode
-        if self.current_episode:
+        if self.current_episode is not None:
+
+            # Discard empty episodes
+            if len(self.current_episode) == 0:
+                self.current_episode = None
+                return
 
             # Mark the episode as finished
-            self.current_episode.finish_episode(completed)
+            self.current_episode.finish_episode(completed, continued)
 
-            # Store the episode info within the buffer lists
-            self.states.extend(self.current_episode.states)
-            self.actions.extend(self.current_episode.actions)
-            self.rewards.extend(self.current_episode.rewards)
-            self.next_states.extend(self.current_episode.next_states)
-            self.final_flags.extend(self.current_episode.final_flags)
-            self.episode_reward.extend(self.current_episode.episode_reward)
-            self.rewards_to_go.extend(self.current_episode.rewards_to_go)
+            # Stream the episode into the dataset if necessary
+            if self.episode_writer is not None:
+                self.episode_writer.append_episode(self.current_episode)
 
             # Store the current episode within the buffer and remove it from the current episode variable
             self.episode_list.append(self.current_episode)
             self.current_episode = None
 
+            # The buffer-wide derived values must be recomputed
+            self._episode_reward = None
+            self._rewards_to_go = None
+
+    def truncated_episodes(self):
+        """
+        Returns the finished episodes that were cut off before reaching a final state
+
+        Returns
+        -------
+        list[Episode]
+        """
+
+        return [episode for episode in self.episode_list if episode.truncated]
+
+    def set_bootstrap_values(self, episodes, values):
+        """
+        Sets the bootstrap values of several truncated episodes
+
+        Parameters
+        ----------
+        episodes: list[Episode]
+        values: list[float]
+        """
+
+        for episode, value in zip(episodes, values):
+            episode.set_bootstrap_value(value)
+
+        # The buffer-wide derived values must be recomputed
+        self._episode_reward = None
+        self._rewards_to_go = None
+
     # Experience management
     def insert_experience(self, state, action, reward, next_state):
         """
@@ -268,7 +493,7 @@ class ReplayBuffer:
         """
 
         # Ignore this method if there is no current episode
-        if self.current_episode:
+        if self.current_episode is not None:
             self.current_episode.insert_experience(state, action, reward, next_state)
 
     # Replay buffer management
@@ -276,19 +501,17 @@ class ReplayBuffer:
         """
         Flushes the replay buffer to empty the information, preparing it for the next training epoch
         """
-        
+
         # The Replay Buffer starts without a current episode
         self.current_episode = None
 
-        # All lists start empty
+        # A new storage is created, so episodes of the previous epoch that are still referenced stay valid
         self.episode_list = []
-        self.states = []
-        self.actions = []
-        self.rewards = []
-        self.next_states = []
-        self.final_flags = []
-        self.episode_reward = []
-        self.rewards_to_go = []
+        self.storage = ExperienceStorage()
+
+        # Derived values are computed when they are first requested
+        self._episode_reward = None
+        self._rewards_to_go = None
 
     def get_epoch_info(self):
         """
@@ -296,8 +519,38 @@ class ReplayBuffer:
 
         Returns
         -------
-        (list[Any], list[int], list[float], list[Any], list[bool], list[float], list[float])
+        (ColumnView, ColumnView, ColumnView, ColumnView, ColumnView, list[float], list[float])
         """
 
         return self.states, self.actions, self.rewards, self.next_states, \
                self.final_flags, self.episode_reward, self.rewards_to_go
+
+    def get_epoch_batch(self, start=0, stop=None, fields=None):
+        """
+        Returns the experiences of all finished episodes of the current epoch as a TransitionBatch.
+
+        A range of the experiences can be specified, so the epoch can be split into micro-batches
+        without converting all experiences at once
+
+        Parameters
+        ----------
+        start: int
+            Index of the first experience
+        stop: int, optional
+            Index after the last experience. If not specified, all experiences until the end are returned
+        fields: Sequence[str], optional
+            Elements of the experiences to convert (for example, ("states", "actions")).
+            The rest of elements are None. If not specified, all elements are converted
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        if stop is None:
+            stop = self.finished_length
+        if fields is None:
+            fields = TransitionBatch.__slots__
+
+        return TransitionBatch.from_lists(*(getattr(self, field)[start:stop] if field in fields else None
+                                            for field in TransitionBatch.__slots__))
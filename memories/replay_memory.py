@@ -0,0 +1,279 @@
+# RL IMPLEMENTATIONS - REPLAY MEMORY
+#
+# Developed by Luna Jimenez Fernandez
+# Based on OpenAI Spin Up
+#
+# This file contains:
+#   - A Replay Memory to be used as a memory for all off-policy (value based) methods, implemented as a ring buffer
+#     with support for n-step returns computed at sample time
+
+# IMPORTS #
+from typing import Optional
+
+import numpy as np
+
+from memories import TransitionBatch
+
+
+# REPLAY MEMORY #
+class ReplayMemory:
+    """
+    A ReplayMemory represents the memory used by off-policy reinforcement-learning methods (such as DQN),
+    used to store the experiences of the agent.
+
+    Unlike Replay Buffers (used by policy gradient methods), Replay Memories are not flushed after use: the
+    experiences are stored in a ring buffer of fixed capacity, where the newest experiences overwrite the oldest.
+
+    Each element of the experiences is stored in a preallocated NumPy array (created when the first experience
+    is inserted), so batches (including n-step returns) are sampled through vectorized index arithmetic
+
+    Parameters
+    ----------
+    capacity: int
+        Maximum amount of experiences stored
+    seed: int, optional
+        Seed of the random generator used to sample the experiences
+
+    Attributes
+    ----------
+    states: np.ndarray
+        Initial states s
+    actions: np.ndarray
+        Actions a
+    rewards: np.ndarray
+        Rewards r
+    next_states: np.ndarray
+        Next states s'
+    final_flags: np.ndarray
+        Final flags f (the episode terminated after the experience)
+    episode_ends: np.ndarray
+        Whether the episode ended after the experience, either because it terminated or because it was cut short
+    """
+
+    # ATTRIBUTES #
+
+    # Maximum amount of experiences stored
+    capacity: int
+    # Current amount of experiences stored
+    size: int
+    # Index where the next experience will be stored
+    position: int
+    # Random generator used to sample the experiences
+    rng: np.random.Generator
+
+    # Storage arrays (None until the first experience is inserted)
+    states: Optional[np.ndarray]
+    actions: Optional[np.ndarray]
+    rewards: Optional[np.ndarray]
+    next_states: Optional[np.ndarray]
+    final_flags: Optional[np.ndarray]
+    episode_ends: Optional[np.ndarray]
+
+    # CONSTRUCTOR #
+    def __init__(self, capacity, seed=None):
+
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+
+        # The memory starts empty, and the arrays are allocated with the first experience
+        self.size = 0
+        self.position = 0
+        self.states = None
+        self.actions = None
+        self.rewards = None
+        self.next_states = None
+        self.final_flags = None
+        self.episode_ends = None
+
+    # PROPERTIES #
+    @property
+    def nbytes(self):
+        """
+        Memory allocated by the storage arrays, in bytes (0 until the first experience is inserted)
+
+        Returns
+        -------
+        int
+        """
+
+        if self.states is None:
+            return 0
+
+        return sum(array.nbytes for array in (self.states, self.actions, self.rewards, self.next_states,
+                                              self.final_flags, self.episode_ends))
+
+    # METHODS #
+    def __len__(self):
+        return self.size
+
+    # Experience management
+    def insert_experience(self, state, action, reward, next_state, final, truncated=False):
+        """
+        Inserts an experience into the memory, overwriting the oldest experience if the memory is full
+
+        Parameters
+        ----------
+        state: Any
+            Initial state s
+        action: int or tuple
+            Action a performed in state s
+        reward: float
+            Reward r obtained after performing action a in state s
+        next_state: Any
+            Next state s' reached after applying action a to state s
+        final: bool
+            Whether s' is a final state
+        truncated: bool
+            Whether the episode was cut short after this experience (without reaching a final state)
+        """
+
+        # Allocate the arrays using the first experience as reference
+        if self.states is None:
+            self._allocate(np.asarray(state), np.asarray(action))
+
+        # Store the experience
+        self.states[self.position] = state
+        self.actions[self.position] = action
+        self.rewards[self.position] = reward
+        self.next_states[self.position] = next_state
+        self.final_flags[self.position] = final
+        self.episode_ends[self.position] = final or truncated
+
+        # Advance the ring buffer
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def insert_batch(self, batch, episode_ends=None):
+        """
+        Inserts a batch of experiences into the memory at once, overwriting the oldest experiences if necessary
+
+        Parameters
+        ----------
+        batch: TransitionBatch
+            Experiences to insert (NumPy based)
+        episode_ends: np.ndarray, optional
+            Whether the episode ended after each experience. If not specified, only final experiences end episodes
+        """
+
+        # Only the newest experiences are kept if the batch is larger than the memory
+        if len(batch) > self.capacity:
+            batch = batch[len(batch) - self.capacity:]
+            episode_ends = episode_ends[-self.capacity:] if episode_ends is not None else None
+
+        if len(batch) == 0:
+            return
+
+        # Allocate the arrays using the first experience as reference
+        if self.states is None:
+            self._allocate(batch.states[0], np.asarray(batch.actions[0]))
+
+        # Store all experiences, wrapping around the ring buffer
+        indices = (self.position + np.arange(len(batch))) % self.capacity
+        self.states[indices] = batch.states
+        self.actions[indices] = batch.actions
+        self.rewards[indices] = batch.rewards
+        self.next_states[indices] = batch.next_states
+        self.final_flags[indices] = batch.final_flags
+        self.episode_ends[indices] = batch.final_flags if episode_ends is None else episode_ends | batch.final_flags
+
+        # Advance the ring buffer
+        self.position = (self.position + len(batch)) % self.capacity
+        self.size = min(self.size + len(batch), self.capacity)
+
+    # Sampling
+    def sample(self, batch_size):
+        """
+        Samples a batch of experiences uniformly
+
+        Parameters
+        ----------
+        batch_size: int
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        indices = self.rng.integers(0, self.size, size=batch_size)
+
+        return TransitionBatch(self.states[indices], self.actions[indices], self.rewards[indices],
+                               self.next_states[indices], self.final_flags[indices])
+
+    def sample_n_step(self, batch_size, n_steps, gamma):
+        """
+        Samples a batch of n-step experiences uniformly.
+
+        For each sampled experience, the rewards of the following (up to) n_steps experiences are accumulated
+        into a discounted return. The accumulation stops early at the end of an episode (either terminated or
+        cut short) and at the newest experience of the memory, handling the ring buffer wraparound.
+
+        The returned batch contains:
+            * states and actions: the sampled experiences
+            * rewards: the n-step discounted returns
+            * next_states: the states to bootstrap from (s' of the last accumulated experience)
+            * final_flags: whether the last accumulated experience reached a final state (no bootstrap)
+
+        In addition, the discount to be applied to the bootstrapped value (gamma ^ accumulated steps)
+        is returned alongside the indices of the last accumulated experiences
+
+        Parameters
+        ----------
+        batch_size: int
+            Amount of experiences to sample
+        n_steps: int
+            Maximum amount of experiences to accumulate
+        gamma: float
+            Discount factor
+
+        Returns
+        -------
+        (TransitionBatch, np.ndarray, np.ndarray)
+            Batch, bootstrap discounts and bootstrap indices
+        """
+
+        # Sample the starting experiences, and compute the indices of their n-step windows (B x n)
+        starts = self.rng.integers(0, self.size, size=batch_size)
+        offsets = np.arange(n_steps)
+        indices = (starts[:, None] + offsets) % self.capacity
+
+        # Amount of experiences stored after each starting experience (the window cannot go beyond the newest one)
+        newest = (self.position - 1) % self.capacity
+        available = (newest - starts) % self.capacity
+
+        # A step of the window is valid if it is within the stored experiences
+        # and no episode ended in any of the previous steps of the window
+        ended = self.episode_ends[indices]
+        ended_before = np.zeros_like(ended)
+        ended_before[:, 1:] = np.logical_or.accumulate(ended[:, :-1], axis=1)
+        valid = (offsets <= available[:, None]) & ~ended_before
+
+        # Accumulate the discounted rewards of the valid steps
+        discounts = gamma ** offsets
+        returns = (self.rewards[indices] * valid) @ discounts
+
+        # Find the last valid step of each window, used to bootstrap
+        lengths = valid.sum(axis=1)
+        bootstrap_indices = indices[np.arange(batch_size), lengths - 1]
+
+        batch = TransitionBatch(self.states[starts], self.actions[starts], returns.astype(np.float32),
+                                self.next_states[bootstrap_indices], self.final_flags[bootstrap_indices])
+
+        return batch, (gamma ** lengths).astype(np.float32), bootstrap_indices
+
+    # HELPER METHODS #
+    def _allocate(self, state, action):
+        """
+        Allocates the storage arrays, using the shape and type of the first experience
+
+        Parameters
+        ----------
+        state: np.ndarray
+        action: np.ndarray
+        """
+
+        self.states = np.zeros((self.capacity,) + state.shape, dtype=state.dtype)
+        self.actions = np.zeros((self.capacity,) + action.shape, dtype=action.dtype)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity,) + state.shape, dtype=state.dtype)
+        self.final_flags = np.zeros(self.capacity, dtype=bool)
+        self.episode_ends = np.zeros(self.capacity, dtype=bool)
@@ -0,0 +1,213 @@
+# RL IMPLEMENTATIONS - COLUMNAR STORAGE
+#
+# Developed by Luna Jimenez Fernandez
+# Based on OpenAI Spin Up
+#
+# This file contains:
+#   - A columnar storage for experiences, where each experience element is stored in its own list
+#   - A column view, used to access a range of a column without copying it
+
+# IMPORTS #
+import sys
+from typing import List, Any, Tuple, Union, Sequence
+
+import numpy as np
+
+# Size of each reference stored within a list
+POINTER_SIZE = 8 if sys.maxsize > 2 ** 32 else 4
+
+
+# COLUMN VIEW #
+class ColumnView(Sequence):
+    """
+    A ColumnView is a read-only view over a contiguous range [start, stop) of a column.
+
+    Slicing a view returns another view over the same column, so no elements are ever copied.
+    Views can be directly converted into NumPy arrays (or tensors through NumPy)
+
+    Parameters
+    ----------
+    column: list
+        Column to be viewed
+    start: int
+        First index of the view within the column
+    stop: int
+        Index after the last element of the view within the column
+    """
+
+    __slots__ = ("column", "start", "stop")
+
+    # ATTRIBUTES #
+
+    # Column to be viewed
+    column: List[Any]
+    # First index of the view within the column
+    start: int
+    # Index after the last element of the view within the column
+    stop: int
+
+    # CONSTRUCTOR #
+    def __init__(self, column, start, stop):
+
+        self.column = column
+        self.start = start
+        self.stop = stop
+
+    # METHODS #
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+
+        # Slices return a new view (only contiguous slices can be represented as views)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self.column[i] for i in range(self.start + start, self.start + stop, step)]
+            return ColumnView(self.column, self.start + start, self.start + max(start, stop))
+
+        # Single elements are accessed directly from the column
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ColumnView index out of range")
+
+        return self.column[self.start + index]
+
+    def __iter__(self):
+        column = self.column
+        for i in range(self.start, self.stop):
+            yield column[i]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.column[self.start:self.stop], dtype=dtype)
+
+    def __eq__(self, other):
+        if isinstance(other, (ColumnView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return "ColumnView(" + repr(self.column[self.start:self.stop]) + ")"
+
+
+# EXPERIENCE STORAGE #
+class ExperienceStorage:
+    """
+    An ExperienceStorage stores experiences in columnar form: each element of the experience
+    (s, a, r, s', f) is stored in its own list, shared by all episodes using the storage
+
+    Attributes
+    ----------
+    states: list[Any]
+        List of states s
+    actions: list[int or tuple]
+        List of actions a
+    rewards: list[float]
+        List of rewards r
+    next_states: list[Any]
+        List of next states s'
+    final_flags: list[bool]
+        List of final flags f
+    """
+
+    # ATTRIBUTES #
+
+    # List of states s
+    states: List[Any]
+    # List of actions a
+    actions: List[Union[int, Tuple]]
+    # List of rewards r
+    rewards: List[float]
+    # List of next states s'
+    next_states: List[Any]
+    # List of final flags f
+    final_flags: List[bool]
+
+    # CONSTRUCTOR #
+    def __init__(self):
+
+        # All columns start empty
+        self.states = []
+        self.actions = []
+        self.rewards = []
+        self.next_states = []
+        self.final_flags = []
+
+    # PROPERTIES #
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the stored experiences, in bytes.
+
+        The size is estimated from the first experience, assuming that each next state is the same
+        object as the following state (as stored by the agents), so only one state is counted per experience
+
+        Returns
+        -------
+        int
+        """
+
+        if not self.rewards:
+            return 0
+
+        # Size of the elements of an experience, plus the references stored by the five columns
+        experience_size = element_size(self.states[0]) + element_size(self.actions[0]) + \
+            element_size(self.rewards[0]) + 5 * POINTER_SIZE
+
+        return len(self) * experience_size
+
+    # METHODS #
+    def __len__(self):
+        return len(self.rewards)
+
+    def append(self, state, action, reward, next_state, final):
+        """
+        Appends an experience to the storage
+
+        Parameters
+        ----------
+        state: Any
+            Initial state s
+        action: int or tuple
+            Action a performed in state s
+        reward: float
+            Reward r obtained after performing action a in state s
+        next_state: Any
+            Next state s' reached after applying action a to state s
+        final: bool
+            Final flag f
+        """
+
+        self.states.append(state)
+        self.actions.append(action)
+        self.rewards.append(reward)
+        self.next_states.append(next_state)
+        self.final_flags.append(final)
+
+
+# STATIC METHODS
+
+def element_size(element):
+    """
+    Returns the approximate memory used by an experience element, in bytes.
+
+    sys.getsizeof only includes the data of NumPy arrays that own it, so the data of array views and
+    array-like wrappers (such as the LazyFrames of Gym) is added to the size of the object
+
+    Parameters
+    ----------
+    element: Any
+
+    Returns
+    -------
+    int
+    """
+
+    size = sys.getsizeof(element)
+
+    # Python scalars and arrays owning their data are already fully counted
+    if isinstance(element, (int, float, bool)) or (isinstance(element, np.ndarray) and element.base is None):
+        return size
+
+    return size + np.asarray(element).nbytes
@@ -0,0 +1,350 @@
+# RL IMPLEMENTATIONS - TRAJECTORY DATASET
+#
+# Developed by Luna Jimenez Fernandez
+#
+# This file contains:
+#   - A Trajectory Writer, streaming finished episodes into chunked columnar files (shards) with an episode index
+#   - A Trajectory Dataset, a lazy random-access reader for the stored episodes
+#
+# Each shard contains one array per experience element (states, actions, rewards, next_states, final_flags) for
+# all of its episodes, alongside the offset of each episode within the shard. Uncompressed shards are directories
+# with one .npy file per array (memory-mapped when read), while compressed shards are single NPZ files.
+# The index (index.json) contains the list of shards and, for each episode, its shard, offset, length and
+# total reward
+
+# IMPORTS #
+import json
+import os
+from collections import OrderedDict
+from typing import List, Any, Dict
+
+import numpy as np
+
+from memories import TransitionBatch
+
+# Name of the index file within the dataset directory
+INDEX_FILE = "index.json"
+# Valid compression modes
+COMPRESSION_MODES = ("none", "deflate", "auto")
+
+
+# TRAJECTORY WRITER #
+class TrajectoryWriter:
+    """
+    A TrajectoryWriter stores finished episodes into a dataset directory, as a sequence of shards.
+
+    Episodes are appended as they finish (for example, by a ReplayBuffer) and buffered in memory until the
+    shard reaches shard_size experiences, at which point the shard is written and the index is updated.
+    Since the index is rewritten after each shard, a dataset can be read while it is still being written.
+
+    Episodes cut off by the end of an epoch and continued by the next one are held back until they finish,
+    so each episode is stored (and indexed) as a single episode
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the dataset. Created if it does not exist. Existing shards are kept and appended to
+    shard_size: int
+        Minimum amount of experiences stored within each shard
+    compression: str
+        Compression of the shards:
+            * "none": arrays are stored uncompressed as .npy files (fastest, memory-mapped when read)
+            * "deflate": arrays are compressed with zlib into a NPZ file
+            * "auto": arrays are only compressed if the states are uint8 frames, which compress very well
+    """
+
+    # ATTRIBUTES #
+
+    # Directory of the dataset
+    directory: str
+    # Minimum amount of experiences stored within each shard
+    shard_size: int
+    # Compression mode of the shards
+    compression: str
+
+    # Index of the dataset (shards and episodes)
+    index: Dict[str, List[Any]]
+    # Episodes buffered for the next shard
+    pending_episodes: List[TransitionBatch]
+    # Amount of experiences buffered for the next shard
+    pending_size: int
+    # Parts of the current episode that were cut off by the end of an epoch
+    continued_parts: List[TransitionBatch]
+
+    # CONSTRUCTOR #
+    def __init__(self, directory, shard_size=100000, compression="auto"):
+
+        if compression not in COMPRESSION_MODES:
+            raise ValueError("compression must be one of {}, got {!r}".format(COMPRESSION_MODES, compression))
+
+        self.directory = directory
+        self.shard_size = shard_size
+        self.compression = compression
+
+        # Continue an existing dataset if there is one
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as index_file:
+                self.index = json.load(index_file)
+        else:
+            self.index = {"shards": [], "episodes": []}
+
+        self.pending_episodes = []
+        self.pending_size = 0
+        self.continued_parts = []
+
+    # METHODS #
+    def append_episode(self, episode):
+        """
+        Appends a finished episode to the dataset. The shard is written once enough experiences are buffered
+
+        Parameters
+        ----------
+        episode: Episode or TransitionBatch
+        """
+
+        # Extract the episode experiences from the (shared) episode storage
+        batch = episode if isinstance(episode, TransitionBatch) else episode.to_batch()
+
+        # Parts of an episode continued by the next epoch are joined with the rest of the episode
+        if getattr(episode, "continued", False):
+            self.continued_parts.append(batch)
+            return
+        if self.continued_parts:
+            batch = TransitionBatch.concatenate(self.continued_parts + [batch])
+            self.continued_parts = []
+
+        # Empty episodes are not stored
+        if len(batch) == 0:
+            return
+
+        self.pending_episodes.append(batch)
+        self.pending_size += len(batch)
+
+        if self.pending_size >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered episodes into a new shard and updates the index
+        """
+
+        # Nothing to write
+        if not self.pending_episodes:
+            return
+
+        # Compute the offsets of the episodes within the shard
+        lengths = [len(batch) for batch in self.pending_episodes]
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        shard = TransitionBatch.concatenate(self.pending_episodes)
+
+        # Write the shard, either as a compressed NPZ file or as a directory of .npy files
+        shard_id = len(self.index["shards"])
+        arrays = {"episode_starts": starts, **{field: getattr(shard, field) for field in TransitionBatch.__slots__}}
+        compress = self.compression == "deflate" or (self.compression == "auto" and shard.states.dtype == np.uint8)
+
+        if compress:
+            shard_file = "shard_{:05d}.npz".format(shard_id)
+            np.savez_compressed(os.path.join(self.directory, shard_file), **arrays)
+        else:
+            shard_file = "shard_{:05d}".format(shard_id)
+            os.makedirs(os.path.join(self.directory, shard_file), exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(self.directory, shard_file, name + ".npy"), array)
+
+        # Update the index
+        self.index["shards"].append({"file": shard_file, "transitions": len(shard), "compressed": compress})
+        for batch, start in zip(self.pending_episodes, starts):
+            self.index["episodes"].append([shard_id, int(start), len(batch), float(batch.rewards.sum())])
+        self._write_index()
+
+        self.pending_episodes = []
+        self.pending_size = 0
+
+    def close(self):
+        """
+        Writes any buffered episode. Must be called once all episodes have been appended.
+
+        The parts of an episode that was never continued (since the training ended) are stored as a single episode
+        """
+
+        if self.continued_parts:
+            batch = TransitionBatch.concatenate(self.continued_parts)
+            self.continued_parts = []
+            self.pending_episodes.append(batch)
+            self.pending_size += len(batch)
+
+        self.flush()
+
+    # HELPER METHODS #
+    def _write_index(self):
+        """
+        Writes the index file, replacing the previous one atomically
+        """
+
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + ".tmp", "w") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(index_path + ".tmp", index_path)
+
+
+# TRAJECTORY DATASET #
+class TrajectoryDataset:
+    """
+    A TrajectoryDataset provides lazy random access to the episodes stored by a TrajectoryWriter.
+
+    Only the index is loaded when the dataset is opened. Uncompressed shards are memory-mapped, so only the
+    accessed episodes are read from disk. Compressed shards are loaded on demand, keeping only the most
+    recently used ones in memory, so datasets larger than the available memory can be read
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the dataset
+    cached_shards: int
+        Maximum amount of shards kept in memory
+
+    Attributes
+    ----------
+    episode_rewards: np.ndarray
+        Total reward of each stored episode
+    episode_lengths: np.ndarray
+        Length of each stored episode
+    """
+
+    # ATTRIBUTES #
+
+    # Directory of the dataset
+    directory: str
+    # Index of the dataset (shards and episodes)
+    index: Dict[str, List[Any]]
+    # Maximum amount of shards kept in memory
+    cached_shards: int
+    # Loaded shards, in least recently used order
+    _shards: "OrderedDict[int, Dict[str, np.ndarray]]"
+
+    # CONSTRUCTOR #
+    def __init__(self, directory, cached_shards=2):
+
+        self.directory = directory
+        self.cached_shards = cached_shards
+        self._shards = OrderedDict()
+
+        with open(os.path.join(directory, INDEX_FILE)) as index_file:
+            self.index = json.load(index_file)
+
+    # PROPERTIES #
+    @property
+    def episode_rewards(self):
+        return np.array([episode[3] for episode in self.index["episodes"]], dtype=np.float64)
+
+    @property
+    def episode_lengths(self):
+        return np.array([episode[2] for episode in self.index["episodes"]], dtype=np.int64)
+
+    @property
+    def total_transitions(self):
+        """
+        Total amount of experiences stored in the dataset
+
+        Returns
+        -------
+        int
+        """
+
+        return sum(shard["transitions"] for shard in self.index["shards"])
+
+    # METHODS #
+    def __len__(self):
+        return len(self.index["episodes"])
+
+    def __getitem__(self, episode_index):
+        """
+        Returns the experiences of an episode. The arrays of uncompressed shards are memory-mapped views
+
+        Parameters
+        ----------
+        episode_index: int
+
+        Returns
+        -------
+        TransitionBatch
+        """
+
+        shard_id, start, length, _ = self.index["episodes"][episode_index]
+        shard = self._load_shard(shard_id)
+        stop = start + length
+
+        return TransitionBatch.from_arrays(*(shard[field][start:stop] for field in TransitionBatch.__slots__))
+
+    def iter_shards(self):
+        """
+        Iterates over all experiences of the dataset, one shard at a time
+
+        Yields
+        ------
+        (TransitionBatch, np.ndarray)
+            Experiences of the shard and offset of each episode within the shard
+        """
+
+        for shard_id in range(len(self.index["shards"])):
+            shard = self._load_shard(shard_id)
+            batch = TransitionBatch.from_arrays(*(shard[field] for field in TransitionBatch.__slots__))
+            yield batch, shard["episode_starts"]
+
+    def fill_replay_memory(self, memory):
+        """
+        Inserts all experiences of the dataset into a ReplayMemory, one shard at a time.
+
+        The last experience of each episode is marked as the end of the episode, so n-step returns
+        never cross episodes
+
+        Parameters
+        ----------
+        memory: ReplayMemory
+        """
+
+        for batch, starts in self.iter_shards():
+
+            # The last experience of each episode precedes the start of the next one
+            episode_ends = np.zeros(len(batch), dtype=bool)
+            episode_ends[starts[1:] - 1] = True
+            episode_ends[-1] = True
+
+            memory.insert_batch(batch, episode_ends)
+
+    # HELPER METHODS #
+    def _load_shard(self, shard_id):
+        """
+        Loads a shard into memory (if it is not loaded yet), evicting the least recently used shard if necessary
+
+        Parameters
+        ----------
+        shard_id: int
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+        """
+
+        if shard_id in self._shards:
+            self._shards.move_to_end(shard_id)
+            return self._shards[shard_id]
+
+        shard_info = self.index["shards"][shard_id]
+        shard_path = os.path.join(self.directory, shard_info["file"])
+
+        # Compressed shards are read completely, while uncompressed shards are memory-mapped
+        if shard_info["compressed"]:
+            with np.load(shard_path) as shard_file:
+                shard = {name: shard_file[name] for name in shard_file.files}
+        else:
+            shard = {name[:-len(".npy")]: np.load(os.path.join(shard_path, name), mmap_mode="r")
+                     for name in os.listdir(shard_path) if name.endswith(".npy")}
+
+        self._shards[shard_id] = shard
+        if len(self._shards) > self.cached_shards:
+            self._shards.popitem(last=False)
+
+        return shard
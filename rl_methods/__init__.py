@@ -7,8 +7,26 @@ Currently value based RL methods are:
 Currently implemented Policy Gradient based RL methods are:
     * Simple policy gradient
     * Vanilla policy gradient (REINFORCE)
+
+All classes are imported lazily when first accessed, so importing this module does not import PyTorch or Gym
 """
 
 # Imports
-from .neural_networks import mlp
-from .base_algorithms import BaseAlgorithm, PolicyGradientAlgorithm, get_categorical_policy
+from utils.lazy_imports import lazy_attributes
+
+# Lazily imported attributes, mapped to the submodule defining them
+_LAZY_ATTRIBUTES = {
+    "mlp": ".neural_networks",
+    "actor_critic_mlp": ".neural_networks",
+    "ActorCritic": ".neural_networks",
+    "estimate_memory_per_sample": ".neural_networks",
+    "BaseAlgorithm": ".base_algorithms",
+    "PolicyGradientAlgorithm": ".base_algorithms",
+    "get_categorical_policy": ".policy_gradient.policy_gradient_utils",
+    "SimpleGradient": ".policy_gradient.simple_gradient",
+    "Reinforce": ".policy_gradient.reinforce",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
@@ -67,7 +67,7 @@ class BaseAlgorithm:
 
         # Check the proper device for the neural networks
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print("Using device: " + self.device)
+        print("Using device: " + str(self.device))
 
     # MAIN METHODS #
     def train(self, *args, **kwargs):
@@ -76,6 +76,35 @@ class BaseAlgorithm:
     def eval(self, *args, **kwargs):
         raise NotImplementedError
 
+    # SERIALIZATION METHODS #
+    def state_dict(self):
+        raise NotImplementedError
+
+    def load_state_dict(self, state_dict):
+        raise NotImplementedError
+
+    def save(self, path):
+        """
+        Stores the state of the algorithm (networks and any additional statistics) into a file
+
+        Parameters
+        ----------
+        path: str
+        """
+
+        torch.save(self.state_dict(), path)
+
+    def load(self, path):
+        """
+        Restores the state of the algorithm (networks and any additional statistics) from a file
+
+        Parameters
+        ----------
+        path: str
+        """
+
+        self.load_state_dict(torch.load(path, map_location=self.device))
+
     # HELPER METHODS #
     def _to_tensor(self, tensor):
         """
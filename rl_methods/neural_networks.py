@@ -9,6 +9,7 @@
 # IMPORTS
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 
 def mlp(input_size, hidden_sizes, hidden_activations, output_size, output_activation):
@@ -48,3 +49,150 @@ def mlp(input_size, hidden_sizes, hidden_activations, output_size, output_activa
 
     # Return the created module
     return nn.Sequential(*layers)
+
+
+class ActorCritic(nn.Module):
+    """
+    Actor-critic network with a shared torso and two heads (policy logits and state value),
+    computed in a single forward pass.
+
+    Both heads are stored as a single linear layer (the last output being the value), so the torso
+    and the heads are computed with one matrix multiplication each
+
+    Parameters
+    ----------
+    torso : nn.Module
+        Shared network, extracting the features used by both heads
+    features_size : int
+        Size of the features extracted by the torso
+    output_size : int
+        Size of the policy output (logits)
+    output_activation : any
+        Activation function used by the policy output
+    detach_value : bool
+        If True, the value head does not propagate gradients into the torso (the torso is only trained
+        by the policy loss)
+    """
+
+    # ATTRIBUTES
+    # Shared torso
+    torso: nn.Module
+    # Fused policy and value heads
+    heads: nn.Linear
+    # Activation function of the policy output
+    output_activation: nn.Module
+    # Whether the value head is detached from the torso gradient
+    detach_value: bool
+
+    # CONSTRUCTOR
+    def __init__(self, torso, features_size, output_size, output_activation, detach_value=False):
+
+        super().__init__()
+
+        self.torso = torso
+        self.heads = nn.Linear(features_size, output_size + 1)
+        self.output_activation = output_activation()
+        self.detach_value = detach_value
+
+    # METHODS
+    def forward(self, x):
+        """
+        Computes the policy logits and the state values
+
+        Parameters
+        ----------
+        x : torch.Tensor
+
+        Returns
+        -------
+        (torch.Tensor, torch.Tensor)
+            Policy logits and state values (without the last dimension)
+        """
+
+        features = self.torso(x)
+
+        if self.detach_value:
+            # The value is computed from detached features, using the last row of the fused heads
+            logits = F.linear(features, self.heads.weight[:-1], self.heads.bias[:-1])
+            values = F.linear(features.detach(), self.heads.weight[-1:], self.heads.bias[-1:])
+        else:
+            # Both heads are computed at once
+            outputs = self.heads(features)
+            logits, values = outputs[..., :-1], outputs[..., -1:]
+
+        return self.output_activation(logits), values.squeeze(-1)
+
+
+def actor_critic_mlp(input_size, hidden_sizes, hidden_activations, output_size, output_activation,
+                     detach_value=False):
+    """
+    Creates an actor-critic network with a shared MLP torso, returning policy logits and values in one call
+
+    Parameters
+    ----------
+    input_size : int
+        Number of inputs
+    hidden_sizes : list[int]
+        List of neurons in each hidden layer of the shared torso
+    hidden_activations : any
+        Activation function used for each hidden layer
+    output_size : int
+        Size of the policy output layer
+    output_activation : any
+        Activation function used by the policy output layer
+    detach_value : bool
+        If True, the value head does not propagate gradients into the shared torso
+
+    Returns
+    -------
+    ActorCritic
+    """
+
+    # Create the shared torso (Input -> Hidden)
+    layers = [nn.Linear(input_size, hidden_sizes[0]), hidden_activations()]
+    for i in range(1, len(hidden_sizes)):
+        layers += [nn.Linear(hidden_sizes[i-1], hidden_sizes[i]), hidden_activations()]
+
+    # Return the network with both heads
+    return ActorCritic(nn.Sequential(*layers), hidden_sizes[-1], output_size, output_activation, detach_value)
+
+
+def estimate_memory_per_sample(network, input_size):
+    """
+    Estimates the memory (in bytes) required per sample to perform a forward and backward pass of a network.
+
+    The estimate includes the input, the output of every layer (kept for the backward pass)
+    and the gradient of each of these outputs. Parameters and optimizer states are not included,
+    since they do not depend on the batch size
+
+    Parameters
+    ----------
+    network : nn.Module
+        Network to estimate
+    input_size : int
+        Number of inputs
+
+    Returns
+    -------
+    int
+    """
+
+    # Measure the output of every layer with a single-sample forward pass
+    output_bytes = []
+
+    def measure_output(module, inputs, output):
+        outputs = output if isinstance(output, tuple) else (output,)
+        output_bytes.append(sum(tensor.numel() * tensor.element_size() for tensor in outputs))
+
+    layers = [module for module in network.modules() if not list(module.children())]
+    hooks = [layer.register_forward_hook(measure_output) for layer in layers]
+
+    sample = torch.zeros(1, input_size, device=next(network.parameters()).device)
+    with torch.no_grad():
+        network(sample)
+
+    for hook in hooks:
+        hook.remove()
+
+    # Outputs are stored twice (activations and gradients)
+    return sample.numel() * sample.element_size() + 2 * sum(output_bytes)
@@ -2,8 +2,20 @@
 Includes implementation for the following Policy Gradient methods:
     * Simple Policy Gradient
     * Vanilla Policy Gradient (REINFORCE)
+
+All classes are imported lazily when first accessed
 """
 
 # IMPORTS
-from simple_gradient import SimpleGradient
-from policy_gradient_utils import get_categorical_policy
+from utils.lazy_imports import lazy_attributes
+
+# Lazily imported attributes, mapped to the submodule defining them
+_LAZY_ATTRIBUTES = {
+    "SimpleGradient": ".simple_gradient",
+    "Reinforce": ".reinforce",
+    "get_categorical_policy": ".policy_gradient_utils",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
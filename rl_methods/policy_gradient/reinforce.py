@@ -1 +1,163 @@
-import torch
\ No newline at end of file
+# RL IMPLEMENTATIONS - REINFORCE
+#
+# Developed by Luna Jimenez Fernandez
+# Based on OpenAI Spin Up
+#
+# Vanilla Policy Gradient (REINFORCE), weighting the gradient with the rewards-to-go
+# minus a learned state-value baseline. Policy and value share a single network
+
+# IMPORTS #
+import numpy as np
+import torch
+from torch.nn import ReLU, Identity
+
+from rl_methods.neural_networks import actor_critic_mlp
+from rl_methods.policy_gradient.policy_gradient_utils import get_categorical_policy
+from rl_methods.policy_gradient.simple_gradient import SimpleGradient
+
+
+# CLASS DEFINITION #
+class Reinforce(SimpleGradient):
+    """
+    Vanilla Policy Gradient (REINFORCE) with a state-value baseline.
+
+    The policy and the value function share the torso of a single actor-critic network, so both acting
+    and the loss computation obtain the logits and the values with a single forward pass
+
+    Parameters
+    ----------
+    env : Env
+        A generic Gym environment
+    value_coef : float
+        Weight of the value loss within the total loss
+    detach_value : bool
+        If True, the value loss does not train the shared torso
+    kwargs : Any
+        Additional arguments of SimpleGradient (normalizers, learning rate and micro-batching)
+    """
+
+    # ATTRIBUTES
+    # Weight of the value loss within the total loss
+    value_coef: float
+    # Whether the value head is detached from the shared torso
+    detach_value: bool
+
+    # Policy (actor-critic) network is created by the parent class
+
+    # The value head is used to bootstrap the episodes cut off by the end of an epoch
+    has_value_function = True
+
+    # CONSTRUCTOR
+    def __init__(self, env, value_coef=0.5, detach_value=False, **kwargs):
+
+        # The network parameters must be available before the parent class builds the network
+        self.value_coef = value_coef
+        self.detach_value = detach_value
+
+        super().__init__(env, **kwargs)
+
+    # HELPER METHODS #
+    def _build_policy_net(self):
+        """
+        Creates the actor-critic network based on the input type
+
+        Returns
+        -------
+        ActorCritic
+        """
+
+        if len(self.obs_shape) > 1:
+            # Shape is bigger than 1 - CNN for images
+            pass
+        else:
+            # Shape is 1 - MLP for simple inputs
+            return actor_critic_mlp(self.obs_shape[0], [32], ReLU, self.act_shape, Identity, self.detach_value)
+
+    def _policy_logits(self, policy_net, observations):
+        # The values are computed in the same forward pass, but are not needed to act
+        return policy_net(observations)[0]
+
+    def _evaluate_values(self, policy_net, observations, normalization):
+        """
+        Estimates the return from each observation using the value head, used to bootstrap truncated episodes.
+
+        The values are de-standardized with the snapshot of the return statistics (and not the current statistics,
+        which may be updated by the learner while the epoch is collected in the background)
+
+        Parameters
+        ----------
+        policy_net: Module
+        observations: Tensor
+        normalization: Normalization
+            Statistics used to de-standardize the values
+
+        Returns
+        -------
+        Tensor
+        """
+
+        with torch.no_grad():
+            values = policy_net(observations)[1]
+
+        # The value head predicts standardized returns if the returns are normalized
+        if normalization.return_mean is not None:
+            values = values * normalization.return_std + normalization.return_mean
+
+        return values
+
+    def _get_loss_weights(self):
+        """
+        Returns the targets of the loss: the rewards-to-go of each state
+
+        Returns
+        -------
+        list[float]
+        """
+
+        return self.replay_buffer.rewards_to_go
+
+    def _compute_losses(self, batch, rewards):
+        """
+        Computes the loss for each state-action pair: the policy gradient loss weighted by the advantages
+        (rewards-to-go minus the value baseline) plus the value regression loss
+
+        Parameters
+        ----------
+        batch: TransitionBatch
+            Batch with all experiences in an epoch, already in the proper device
+        rewards: list[float]
+            List of rewards-to-go for each state
+
+        Returns
+        -------
+        Tensor
+        """
+
+        # Extract the observations and actions, and convert the rewards-to-go into a tensor
+        observations = batch.states.float()
+        actions = batch.actions
+        rewards = self._weights_to_tensor(rewards)
+
+        # Compute the logits and values with a single forward pass
+        logits, values = self.policy_net(observations)
+        log_probs = get_categorical_policy(logits).log_prob(actions)
+
+        # The baseline does not propagate gradients through the policy loss
+        advantages = rewards - values.detach()
+        policy_loss = -(log_probs * advantages).mean()
+        value_loss = (rewards - values).pow(2).mean()
+
+        return policy_loss + self.value_coef * value_loss
+
+    def _update_return_normalizer(self, reward_scale=1.0):
+        """
+        Updates the return statistics with the rewards-to-go stored in the replay buffer
+
+        Parameters
+        ----------
+        reward_scale: float
+            Factor applied to the rewards
+        """
+
+        if self.return_normalizer is not None:
+            self.return_normalizer.update(np.asarray(self.replay_buffer.rewards_to_go) * reward_scale)
@@ -7,16 +7,51 @@
 # gradient calculation without advantages
 
 # IMPORTS #
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+
 import gym
+import numpy as np
 
+import torch
 from torch import Tensor
 from torch.nn import Module, ReLU, Identity
 from torch.distributions import Categorical
 from torch.optim import Adam
 
+from memories import ReplayBuffer
 from rl_methods import PolicyGradientAlgorithm, mlp
+from rl_methods.neural_networks import estimate_memory_per_sample
 from rl_methods.policy_gradient import get_categorical_policy
 from utils import PolicyGradientLogger
+from utils.normalizers import RunningMeanStd, RewardNormalizer
+from utils.telemetry import Telemetry
+
+
+# Amount of observations converted at once when updating the observation statistics
+STATISTICS_CHUNK_SIZE = 1024
+
+
+# NORMALIZATION SNAPSHOT #
+class Normalization(NamedTuple):
+    """
+    Snapshot of the statistics used to normalize the observations, rewards and returns of an epoch.
+
+    The statistics are only updated between epochs (from all experiences of the epoch at once),
+    so the collection and the update of an epoch always use the same snapshot
+    """
+
+    # Mean and standard deviation of the observations, as tensors in the device (None if not normalized)
+    obs_mean: Optional[Tensor]
+    obs_std: Optional[Tensor]
+    # Clipping range of the normalized observations
+    obs_clip: Optional[float]
+    # Factor applied to the rewards (1 if the rewards are not normalized)
+    reward_scale: float
+    # Mean and standard deviation of the returns, used to de-standardize the values (None if not normalized)
+    return_mean: Optional[float]
+    return_std: Optional[float]
 
 
 # CLASS DEFINITION #
@@ -29,6 +64,29 @@ class SimpleGradient(PolicyGradientAlgorithm):
     ----------
     env : Env
         A generic Gym environment
+    normalize_observations : bool
+        If True, observations are standardized with running statistics before being used
+    normalize_rewards : bool
+        If True, rewards are scaled by the running deviation of the discounted return
+
+        Experiences are always stored raw: both statistics are updated once per epoch, and the experiences of
+        each epoch are normalized with the statistics of the previous epochs
+    normalize_returns : bool
+        If True, the episode rewards used to weight the gradient are standardized with running statistics
+    gamma : float
+        Discount factor used by the reward normalizer
+    learning_rate : float
+        Learning rate of the optimizer
+    micro_batch_size : int, optional
+        If specified, each update is split into micro-batches of this size, accumulating their gradients
+    update_memory_budget : int, optional
+        If specified (and micro_batch_size is not), the micro-batch size is chosen so the experiences and
+        activations of each micro-batch, the gradients and the optimizer states fit within this amount of bytes
+
+    Attributes
+    ----------
+    telemetry : Telemetry, optional
+        If set, the environment steps and gradient updates are counted, and the replay buffers are watched
     """
 
     # NETWORKS AND MEMORIES
@@ -37,157 +95,552 @@ class SimpleGradient(PolicyGradientAlgorithm):
 
     # Replay Buffer is created in the parent class
 
+    # NORMALIZERS
+    # Each normalizer is None if the corresponding normalization is not used
+    # Running statistics of the observations
+    obs_normalizer: Optional[RunningMeanStd]
+    # Running statistics of the discounted return, used to scale the rewards
+    reward_normalizer: Optional[RewardNormalizer]
+    # Running statistics of the episode rewards, used to standardize the gradient weights
+    return_normalizer: Optional[RunningMeanStd]
+
+    # UPDATE PARAMETERS
+    # Learning rate of the optimizer
+    learning_rate: float
+    # Size of the micro-batches used in each update (None if not fixed)
+    micro_batch_size: Optional[int]
+    # Memory budget (in bytes) used to choose the micro-batch size (None if not used)
+    update_memory_budget: Optional[int]
+
+    # TELEMETRY
+    # Telemetry counting the steps and updates (None if not used)
+    telemetry: Optional[Telemetry]
+
+    # ROLLOUT STATE
+    # Whether the algorithm learns a value function, used to bootstrap the episodes cut off by the end of an epoch.
+    # Algorithms without a value function finish the last episode of each epoch instead of cutting it off
+    has_value_function = False
+    # Elements of the experiences read by the losses (the only ones converted during the updates)
+    loss_fields = ("states", "actions")
+    # Observation where the next epoch continues (None if the environment must be reset)
+    _last_observation: Optional[Any]
+    # Return accumulated by the current episode, continued across epochs
+    _episode_return: float
+
     # CONSTRUCTOR
-    def __init__(self, env):
+    def __init__(self, env, normalize_observations=False, normalize_rewards=False, normalize_returns=False,
+                 gamma=0.99, learning_rate=1e-3, micro_batch_size=None, update_memory_budget=None):
 
         # Prepare the environment, replay buffer and device for Torch
         super().__init__(env)
 
-        # Instantiate the policy network based on the input type
-        # Simple gradient does not have a separate critic network.
-        if len(self.obs_shape) > 1:
-            # Shape is bigger than 1 - CNN for images
-            pass
-        else:
-            # Shape is 1 - MLP for simple inputs
-            self.policy_net = mlp(self.obs_shape[0], [32], ReLU, self.act_shape, Identity)
-
-        # Send the neural network to the proper device
+        # Instantiate the policy network and send it to the proper device
+        self.policy_net = self._build_policy_net()
         self.policy_net.to(self.device)
 
+        # Observation where the next epoch continues (None if the environment must be reset)
+        self._last_observation = None
+        self._episode_return = 0.0
+
+        # Instantiate the required normalizers
+        self.obs_normalizer = RunningMeanStd(self.obs_shape, clip=10.0) if normalize_observations else None
+        self.reward_normalizer = RewardNormalizer(gamma) if normalize_rewards else None
+        self.return_normalizer = RunningMeanStd() if normalize_returns else None
+
+        # Store the update parameters
+        self.learning_rate = learning_rate
+        self.micro_batch_size = micro_batch_size
+        self.update_memory_budget = update_memory_budget
+
+        # Telemetry is not used unless it is set
+        self.telemetry = None
+
     # MAIN METHODS
-    def train(self, total_epochs, steps_per_epoch):
+    def train(self, total_epochs, steps_per_epoch, logger=None, pipelined=False, epoch_callback=None):
         """
         Trains the agent for total_epochs. The agent runs for steps_per_epoch steps, and then performs training
         based on the on-policy experiences, updating the network weights
 
+        If pipelined, the experiences of the next epoch are collected by a background thread while the
+        network is updated (see _train_pipelined)
+
         Parameters
         ----------
         total_epochs: int
             Total number of epochs to train
         steps_per_epoch: int
-            How many steps are performed in each epoch. This number is approximate - epochs will be this size
-            or slightly larger but never smaller, since the last episode within the epoch will not be finished
+            How many steps are performed in each epoch. If the algorithm has a value function, the last episode
+            within the epoch is cut off, bootstrapped and continued by the next epoch. Otherwise, the last
+            episode is run until it finishes (so the epoch may be longer)
+        logger: PolicyGradientLogger, optional
+            Logger used to display and store the epoch metrics. If not specified, a new logger is created
+        pipelined: bool
+            If True, experience collection and network updates are overlapped
+        epoch_callback: Callable, optional
+            Function called at the end of each epoch (after the update) as
+            epoch_callback(agent, epoch, optimizer, metrics), where metrics are the logged values of the epoch.
+            The callback may modify the agent and the optimizer (for example, to load new weights or
+            change the learning rate) before the next epoch starts
         """
 
         # Prepare the logger for training
-        logger = PolicyGradientLogger()
+        if logger is None:
+            logger = PolicyGradientLogger()
 
         # Prepare the optimizer
         # ADAM is used for simplicity
-        optimizer = Adam()
+        optimizer = Adam(self.policy_net.parameters(), lr=self.learning_rate)
+
+        # Watch the replay buffer (which may be replaced during training)
+        if self.telemetry is not None:
+            self.telemetry.watch_memory("replay_buffer", lambda: self.replay_buffer)
+
+        if pipelined:
+            self._train_pipelined(total_epochs, steps_per_epoch, logger, optimizer, epoch_callback)
+            return
 
         # Perform each epoch separately
         for epoch in range(total_epochs):
             # Handle the epoch by letting the agent run for the specified number of steps
-            self._epoch(steps_per_epoch)
+            normalization = self._get_normalization()
+            episode_returns = self._epoch(steps_per_epoch, normalization=normalization)
 
-            # Extract the info from the replay buffer
-            states, actions, rewards, \
-            next_states, final_flags, \
-            episode_reward, rewards_to_go = self.replay_buffer.get_epoch_info()
+            # Update the normalization statistics with the whole epoch
+            self._update_normalizers(self.replay_buffer)
 
-            # Reset the optimizer gradients
-            optimizer.zero_grad()
-
-            # Obtain the loss (gradients)
-            loss = self._compute_losses(states, actions, episode_reward)
-
-            # Perform gradient descent
-            loss.backward()
-            optimizer.step()
+            # Update the network with the experiences of the epoch and log the results
+            loss = self._update(optimizer, normalization)
+            metrics = self._log_epoch(logger, epoch, loss, episode_returns)
 
             # Flush the replay buffer after the update
             self.replay_buffer.empty()
 
+            if epoch_callback is not None:
+                epoch_callback(self, epoch, optimizer, metrics)
+
     def eval(self, total_steps):
         pass
 
+    def state_dict(self):
+        """
+        Returns the state of the algorithm: the policy network weights and the normalizer statistics
+
+        Returns
+        -------
+        dict
+        """
+
+        state_dict = {"policy_net": self.policy_net.state_dict()}
+
+        # Store the statistics of each used normalizer
+        for name in ("obs_normalizer", "reward_normalizer", "return_normalizer"):
+            normalizer = getattr(self, name)
+            if normalizer is not None:
+                state_dict[name] = normalizer.state_dict()
+
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        """
+        Restores the state of the algorithm from a dictionary created by state_dict
+
+        Parameters
+        ----------
+        state_dict: dict
+        """
+
+        self.policy_net.load_state_dict(state_dict["policy_net"])
+
+        # Restore the statistics of each used normalizer
+        for name in ("obs_normalizer", "reward_normalizer", "return_normalizer"):
+            normalizer = getattr(self, name)
+            if normalizer is not None and name in state_dict:
+                normalizer.load_state_dict(state_dict[name])
+
     # TODO PREPARE FOR DISCRETE AND CONTINUOUS
-    def act(self, observation):
+    def act(self, observation, policy_net=None, normalization=None):
         """
         Given an observation, sample and return an action or a list of actions to perform
 
         Parameters
         ----------
         observation: Tensor
+            Raw observation, as returned by the environment
+        policy_net: Module, optional
+            Network used to choose the action. If not specified, the policy network of the agent is used
+        normalization: Normalization, optional
+            Statistics used to normalize the observation. If not specified, the current statistics are used
 
         Returns
         -------
         int or list
         """
 
+        if policy_net is None:
+            policy_net = self.policy_net
+
         # Identify the output type
         if isinstance(self.act_space, gym.spaces.Discrete):
 
-            # Convert the observation into a tensor
-            observation = self._to_tensor(observation)
+            # Convert the observation into a normalized tensor
+            if normalization is None:
+                normalization = self._get_normalization()
+            observation = self._normalize_observations(self._to_tensor(observation), normalization)
 
             # Create the policy from the policy network
-            policy = get_categorical_policy(observation)
+            with torch.no_grad():
+                policy = get_categorical_policy(self._policy_logits(policy_net, observation))
 
             # Return a single sampled action from said policy
             return policy.sample().item()
 
     # HELPER METHODS #
 
-    def _epoch(self, total_steps):
+    def _train_pipelined(self, total_epochs, steps_per_epoch, logger, optimizer, epoch_callback=None):
         """
-        Runs the agent for "total_steps" as a single epoch
+        Trains the agent overlapping experience collection and network updates.
+
+        Two replay buffers are used: while the network is updated with the experiences of one buffer,
+        a background thread fills the other one using a snapshot of the policy network. Buffers are swapped
+        (without copying any data) at the end of each epoch, and the snapshot is synchronized with the
+        policy network before each collection starts.
+
+        Since the next epoch is collected during the update, experiences are collected with a policy
+        one version older than the policy being updated. This staleness is logged for every epoch.
+        Each epoch is collected and updated with the same normalization statistics, updated before the next
+        collection starts.
+        Changes performed by the epoch callback reach the collector when the snapshot is next synchronized
 
         Parameters
         ----------
-        total_steps: int
+        total_epochs: int
+            Total number of epochs to train
+        steps_per_epoch: int
+            How many steps are performed in each epoch
+        logger: PolicyGradientLogger
+            Logger used to display and store the epoch metrics
+        optimizer: Optimizer
+            Optimizer used to update the policy network
+        epoch_callback: Callable, optional
+            Function called at the end of each epoch (see train)
+        """
+
+        # Snapshot of the policy network used by the collector, and version of the policy it contains
+        actor_net = copy.deepcopy(self.policy_net)
+        actor_version = 0
+        # Version of the policy network (number of updates performed)
+        policy_version = 0
+
+        # The buffer being filled by the collector and the buffer used for the update
+        buffers = [self.replay_buffer, ReplayBuffer(self.replay_buffer.episode_writer)]
+        if self.telemetry is not None:
+            self.telemetry.watch_memory("collection_buffer", lambda: buffers[0])
+
+        with ThreadPoolExecutor(max_workers=1) as collector:
+
+            # Collect the first epoch with the initial policy
+            normalization = self._get_normalization()
+            collection = collector.submit(self._epoch, steps_per_epoch, buffers[0], actor_net, normalization)
+
+            for epoch in range(total_epochs):
+
+                # Wait until the collection of the current epoch finishes and swap the buffers
+                episode_returns = collection.result()
+                collected_version, collected_normalization = actor_version, normalization
+                self.replay_buffer, buffers = buffers[0], buffers[::-1]
+
+                # Update the normalization statistics with the collected epoch
+                self._update_normalizers(self.replay_buffer)
+
+                # Synchronize the snapshots and start collecting the next epoch in the background
+                if epoch + 1 < total_epochs:
+                    actor_net.load_state_dict(self.policy_net.state_dict())
+                    actor_version = policy_version
+                    normalization = self._get_normalization()
+                    collection = collector.submit(self._epoch, steps_per_epoch, buffers[0], actor_net, normalization)
+
+                # Update the network with the collected experiences while the next epoch is collected
+                loss = self._update(optimizer, collected_normalization)
+                metrics = self._log_epoch(logger, epoch, loss, episode_returns,
+                                          staleness=policy_version - collected_version)
+                policy_version += 1
+
+                # Flush the used buffer, so it can be filled again
+                self.replay_buffer.empty()
+
+                if epoch_callback is not None:
+                    epoch_callback(self, epoch, optimizer, metrics)
+
+    def _update(self, optimizer, normalization=None):
         """
+        Updates the policy network with the experiences stored in the replay buffer
+
+        The experiences are converted and processed in micro-batches (see _get_micro_batch_size). The loss of each
+        micro-batch is weighted by its share of the epoch before accumulating its gradient, so the final gradient is
+        the same as the gradient of the full batch while the peak memory is bounded by the micro-batch size
 
-        # Counter of the current amount of steps
-        current_steps = 0
-        # Whether the current episode is finished or not
-        finished = False
+        Parameters
+        ----------
+        optimizer: Optimizer
+            Optimizer used to update the policy network
+        normalization: Normalization, optional
+            Statistics used to normalize the experiences (the ones used to collect them).
+            If not specified, the current statistics are used
 
-        # Prepare the environment and the buffer for training, obtaining the first observations / state
-        current_obs = self.env.reset()
-        self.replay_buffer.start_episode()
+        Returns
+        -------
+        float
+            Loss of the update
+        """
+
+        if normalization is None:
+            normalization = self._get_normalization()
+
+        # Extract the gradient weights from the replay buffer, in the scale of the normalized rewards
+        weights = np.asarray(self._get_loss_weights(), dtype=np.float32) * np.float32(normalization.reward_scale)
+        total_size = self.replay_buffer.finished_length
+        micro_batch_size = self._get_micro_batch_size(total_size)
+
+        # Update the episode reward statistics with the new episodes
+        self._update_return_normalizer(normalization.reward_scale)
+
+        # Reset the optimizer gradients
+        optimizer.zero_grad()
+
+        # The states of every micro-batch are converted into the same float tensor, so the memory freed by a
+        # micro-batch does not need to be reused (or fragmented) by the next one
+        float_states = torch.empty((min(micro_batch_size, total_size),) + tuple(self.obs_shape), device=self.device)
+
+        # Accumulate the gradients of each micro-batch
+        total_loss = 0.0
+        for start in range(0, total_size, micro_batch_size):
+            stop = min(start + micro_batch_size, total_size)
+
+            # Extract the experiences of the micro-batch (as a batch in the proper device)
+            batch = self.replay_buffer.get_epoch_batch(start, stop, self.loss_fields).to(self.device)
+            batch.states = self._normalize_observations(batch.states, normalization, float_states[:stop - start])
+
+            # Obtain the loss (gradients), weighted by the share of the micro-batch
+            loss = self._compute_losses(batch, weights[start:stop]) * ((stop - start) / total_size)
+            loss.backward()
+            total_loss += loss.item()
+
+            # Release the micro-batch before converting the next one, so two micro-batches are never alive at once
+            del batch, loss
+
+        # Perform gradient descent
+        optimizer.step()
+        if self.telemetry is not None:
+            self.telemetry.count_update(total_size)
+
+        return total_loss
+
+    def _get_micro_batch_size(self, total_size):
+        """
+        Returns the size of the micro-batches used to update the network:
+            * The fixed micro-batch size, if specified
+            * The largest size fitting within the memory budget, if specified
+            * The full batch otherwise
+
+        Parameters
+        ----------
+        total_size: int
+            Amount of experiences in the epoch
+
+        Returns
+        -------
+        int
+        """
+
+        if self.micro_batch_size is not None:
+            return self.micro_batch_size
+
+        if self.update_memory_budget is None or total_size == 0:
+            return max(total_size, 1)
+
+        # Memory of each staged experience (states and actions, as stored) plus the memory of the forward
+        # and backward passes (which includes the states converted to float)
+        sample_size = sum(np.asarray(getattr(self.replay_buffer, field)[0]).nbytes for field in self.loss_fields) + \
+            estimate_memory_per_sample(self.policy_net, int(np.prod(self.obs_shape)))
+
+        # The gradients and optimizer states (two per parameter) do not depend on the micro-batch size
+        parameter_size = sum(parameter.numel() * parameter.element_size() for parameter in self.policy_net.parameters())
+        available_memory = self.update_memory_budget - 3 * parameter_size
+
+        return max(1, min(total_size, available_memory // sample_size))
+
+    def _log_epoch(self, logger, epoch, loss, episode_returns, **metrics):
+        """
+        Logs the metrics of an epoch. The mean episode reward only considers the episodes finished within the epoch
+        (with their full return, even if they started in a previous epoch), and is NaN if no episode finished
+
+        Parameters
+        ----------
+        logger: PolicyGradientLogger
+            Logger used to display and store the metrics
+        epoch: int
+            Index of the epoch
+        loss: float
+            Loss of the update
+        episode_returns: list[float]
+            Return of each episode finished within the epoch
+        metrics: Any
+            Additional metrics to log
+
+        Returns
+        -------
+        dict
+            All the logged values
+        """
+
+        mean_episode_reward = sum(episode_returns) / len(episode_returns) if episode_returns else float("nan")
+        return logger.log_epoch(epoch, steps=self.replay_buffer.finished_length, episodes=len(episode_returns),
+                                mean_episode_reward=mean_episode_reward, loss=loss, **metrics)
+
+    def _epoch(self, total_steps, replay_buffer=None, policy_net=None, normalization=None):
+        """
+        Runs the agent for "total_steps" as a single epoch
+
+        If the algorithm has a value function, episodes continue across epochs: the last episode of the epoch
+        is cut off (truncated) and continued by the next epoch. Otherwise, the last episode is run until it finishes,
+        so its return is not biased. Episodes ended by a time limit are truncated instead of terminated.
+        At the end of the epoch, all truncated episodes are bootstrapped with a single batched value evaluation
+        (see _bootstrap_truncated_episodes)
+
+        Parameters
+        ----------
+        total_steps: int
+        replay_buffer: ReplayBuffer, optional
+            Buffer where the experiences are stored. If not specified, the replay buffer of the agent is used
+        policy_net: Module, optional
+            Network used to choose the actions. If not specified, the policy network of the agent is used
+        normalization: Normalization, optional
+            Statistics used to normalize the observations. If not specified, the current statistics are used
 
-        # The epoch will run until an episode is finished AFTER total_steps has been reached
-        while not finished and current_steps < total_steps:
+        Returns
+        -------
+        list[float]
+            Return of each episode finished within the epoch (including the steps of previous epochs)
+        """
 
-            # Mark episode as not finished
-            finished = False
+        if replay_buffer is None:
+            replay_buffer = self.replay_buffer
+        if normalization is None:
+            normalization = self._get_normalization()
+        telemetry = self.telemetry
+        episode_returns = []
+
+        # Continue the episode cut off by the previous epoch, or reset the environment if there is none
+        current_obs = self._last_observation
+        if current_obs is None:
+            current_obs = self.env.reset()[0]
+            self._episode_return = 0.0
+        replay_buffer.start_episode()
+
+        # Algorithms without a value function keep running until the last episode finishes
+        steps = 0
+        done = False
+        while steps < total_steps or not (done or self.has_value_function):
 
             # Find the proper action for the agent
-            act = self.act(current_obs)
+            act = self.act(current_obs, policy_net, normalization)
 
             # Act in the environment
-            next_obs, reward, done, _ = self.env.step(act)
-
-            # Store the current experience and mark the next observation as the current state
-            self.replay_buffer.insert_experience(current_obs, act, reward, next_obs)
+            # Episodes ended by a time limit are cut off, rather than reaching a final state
+            next_obs, reward, terminated, truncated, _ = self.env.step(act)
+            done = terminated or truncated
+            steps += 1
+            self._episode_return += reward
+            if telemetry is not None:
+                telemetry.count_steps()
+
+            # Store the current (raw) experience and mark the next observation as the current state
+            replay_buffer.insert_experience(current_obs, act, reward, next_obs)
+            current_obs = next_obs
 
             # Check if the episode is over
             if done:
-                # Mark the episode as finished
-                finished = True
-
                 # Reset the environment
-                current_obs = self.env.reset()
+                current_obs = self.env.reset()[0]
+                episode_returns.append(self._episode_return)
+                self._episode_return = 0.0
 
                 # Finish the episode in the buffer and start the next episode
-                self.replay_buffer.finish_episode(done)
-                self.replay_buffer.start_episode()
+                replay_buffer.finish_episode(terminated)
+                replay_buffer.start_episode()
+
+        # Cut off the last episode (empty if the algorithm has no value function), to be continued by the next epoch
+        replay_buffer.finish_episode(False, continued=True)
+        self._last_observation = current_obs
 
-    def _compute_losses(self, observations, actions, rewards):
+        # Estimate the return after the cut-off of all truncated episodes
+        self._bootstrap_truncated_episodes(replay_buffer, policy_net, normalization)
+
+        return episode_returns
+
+    def _bootstrap_truncated_episodes(self, replay_buffer, policy_net=None, normalization=None):
+        """
+        Sets the bootstrap value of all truncated episodes in the buffer, evaluating the value
+        of their last reached states with a single batched forward pass
+
+        Parameters
+        ----------
+        replay_buffer: ReplayBuffer
+            Buffer containing the episodes
+        policy_net: Module, optional
+            Network used to evaluate the values. If not specified, the policy network of the agent is used
+        normalization: Normalization, optional
+            Statistics used to normalize the observations. If not specified, the current statistics are used
+        """
+
+        episodes = replay_buffer.truncated_episodes()
+        if not episodes:
+            return
+
+        if policy_net is None:
+            policy_net = self.policy_net
+        if normalization is None:
+            normalization = self._get_normalization()
+
+        # Evaluate the last reached state of all truncated episodes at once
+        states = self._to_tensor(np.stack([np.asarray(episode.next_states[-1]) for episode in episodes]))
+        values = self._evaluate_values(policy_net, self._normalize_observations(states, normalization), normalization)
+
+        # Algorithms without a value function keep a bootstrap value of 0
+        # The values are estimated for normalized rewards, while the buffer stores raw rewards
+        if values is not None:
+            replay_buffer.set_bootstrap_values(episodes, (values / normalization.reward_scale).tolist())
+
+    def _evaluate_values(self, policy_net, observations, normalization):
+        """
+        Estimates the return from each observation, used to bootstrap truncated episodes.
+
+        Simple gradient does not have a value function, so no estimate is available
+
+        Parameters
+        ----------
+        policy_net: Module
+        observations: Tensor
+        normalization: Normalization
+            Statistics used to de-standardize the values
+
+        Returns
+        -------
+        Tensor or None
+        """
+
+        return None
+
+    def _compute_losses(self, batch, rewards):
         """
         Computes the loss (gradient descent) for each state-action pair
 
-        The method internally transforms all necessary lists into tensors
+        The method internally transforms the rewards list into a tensor
 
         Parameters
         ----------
-        observations: list[Any]
-            List of all observations (states) in an epoch
-        actions: list[int]
-            List of all actions for each corresponding state
+        batch: TransitionBatch
+            Batch with all experiences in an epoch, already in the proper device
         rewards: list[float]
             List of EPISODE rewards for each state
 
@@ -196,13 +649,13 @@ class SimpleGradient(PolicyGradientAlgorithm):
         Tensor
         """
 
-        # Convert all lists into tensors
-        observations = self._to_tensor(observations)
-        actions = self._to_tensor(actions)
-        rewards = self._to_tensor(rewards)
+        # Extract the observations and actions, and convert the rewards into a tensor
+        observations = batch.states.float()
+        actions = batch.actions
+        rewards = self._weights_to_tensor(rewards)
 
         # Compute the log-probability of all state-action pairs
-        log_probs = self._get_categorical_policy(observations).log_prob(actions)
+        log_probs = get_categorical_policy(self._policy_logits(self.policy_net, observations)).log_prob(actions)
 
         # Obtain the gradient and return it
         # Negative value is used to perform gradient ascent
@@ -210,3 +663,164 @@ class SimpleGradient(PolicyGradientAlgorithm):
         gradients = -(log_probs * rewards).mean()
 
         return gradients
+
+    def _build_policy_net(self):
+        """
+        Creates the policy network based on the input type.
+        Simple gradient does not have a separate critic network.
+
+        Returns
+        -------
+        Module
+        """
+
+        if len(self.obs_shape) > 1:
+            # Shape is bigger than 1 - CNN for images
+            pass
+        else:
+            # Shape is 1 - MLP for simple inputs
+            return mlp(self.obs_shape[0], [32], ReLU, self.act_shape, Identity)
+
+    def _policy_logits(self, policy_net, observations):
+        """
+        Computes the policy logits of the observations using the given policy network
+
+        Parameters
+        ----------
+        policy_net: Module
+        observations: Tensor
+
+        Returns
+        -------
+        Tensor
+        """
+
+        return policy_net(observations)
+
+    def _get_loss_weights(self):
+        """
+        Returns the weights of the log-probabilities in the loss: the EPISODE reward of each state
+
+        Returns
+        -------
+        list[float]
+        """
+
+        return self.replay_buffer.episode_reward
+
+    def _weights_to_tensor(self, weights):
+        """
+        Converts the loss weights into a tensor, standardizing them in place if necessary
+
+        Parameters
+        ----------
+        weights: list[float]
+
+        Returns
+        -------
+        Tensor
+        """
+
+        weights = self._to_tensor(np.asarray(weights, dtype=np.float32))
+
+        if self.return_normalizer is not None:
+            weights.sub_(float(self.return_normalizer.mean)).div_(float(self.return_normalizer.std))
+
+        return weights
+
+    def _get_normalization(self):
+        """
+        Returns a snapshot of the current normalization statistics
+
+        Returns
+        -------
+        Normalization
+        """
+
+        obs_mean = obs_std = obs_clip = None
+        if self.obs_normalizer is not None and self.obs_normalizer.count > 0:
+            obs_mean = self._to_tensor(self.obs_normalizer.mean.astype(np.float32))
+            obs_std = self._to_tensor(self.obs_normalizer.std.astype(np.float32))
+            obs_clip = self.obs_normalizer.clip
+
+        reward_scale = self.reward_normalizer.scale if self.reward_normalizer is not None else 1.0
+
+        return_mean = return_std = None
+        if self.return_normalizer is not None:
+            return_mean, return_std = float(self.return_normalizer.mean), float(self.return_normalizer.std)
+
+        return Normalization(obs_mean, obs_std, obs_clip, reward_scale, return_mean, return_std)
+
+    def _normalize_observations(self, observations, normalization, out=None):
+        """
+        Converts a tensor of raw observations (a single one or a batch) into normalized float observations.
+
+        Observations are not normalized if observation normalization is not used, or until the statistics
+        of the first epoch are available. The input tensor is never modified
+
+        Parameters
+        ----------
+        observations: Tensor
+        normalization: Normalization
+        out: Tensor, optional
+            If specified, the observations are converted into this float tensor (with the same shape)
+            instead of allocating a new one
+
+        Returns
+        -------
+        Tensor
+        """
+
+        # Convert the observations into a single float tensor, which is then normalized in place
+        if out is not None:
+            normalized = out.copy_(observations)
+        else:
+            normalized = observations.float()
+            if normalization.obs_mean is None:
+                return normalized
+            if normalized is observations:
+                normalized = normalized.clone()
+
+        if normalization.obs_mean is not None:
+            normalized.sub_(normalization.obs_mean).div_(normalization.obs_std)
+            if normalization.obs_clip is not None:
+                normalized.clamp_(-normalization.obs_clip, normalization.obs_clip)
+
+        return normalized
+
+    def _update_normalizers(self, replay_buffer):
+        """
+        Updates the observation and reward statistics with all experiences of an epoch at once
+
+        Parameters
+        ----------
+        replay_buffer: ReplayBuffer
+            Buffer containing the (raw) experiences of the epoch
+        """
+
+        # Observations are converted by chunks, so large observations (images) are never converted all at once
+        if self.obs_normalizer is not None:
+            states = replay_buffer.states
+            for start in range(0, len(states), STATISTICS_CHUNK_SIZE):
+                self.obs_normalizer.update(states[start:start + STATISTICS_CHUNK_SIZE])
+
+        # The discounted return is reset at the end of each episode, except for the episodes continued by the next epoch
+        if self.reward_normalizer is not None:
+            episode_ends = np.zeros(replay_buffer.finished_length, dtype=bool)
+            episode_ends[[episode.stop - 1 for episode in replay_buffer.episode_list if not episode.continued]] = True
+            self.reward_normalizer.update(replay_buffer.rewards, episode_ends)
+
+    def _update_return_normalizer(self, reward_scale=1.0):
+        """
+        Updates the episode reward statistics with the episodes stored in the replay buffer.
+        Each episode is counted once, regardless of its length
+
+        Parameters
+        ----------
+        reward_scale: float
+            Factor applied to the rewards
+        """
+
+        if self.return_normalizer is not None:
+            self.return_normalizer.update([sum(episode.rewards) * reward_scale
+                                           for episode in self.replay_buffer.episode_list])
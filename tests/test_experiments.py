@@ -0,0 +1,32 @@
+# RL IMPLEMENTATIONS - EXPERIMENT TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the expansion of configurations into individual runs
+
+# IMPORTS #
+import pytest
+
+from utils.experiments import expand_runs
+
+
+def test_unnamed_variants_get_their_own_directories():
+    runs = expand_runs({"output_dir": "runs", "runs": [{"algorithm_kwargs": {"learning_rate": 1e-3}},
+                                                       {"algorithm_kwargs": {"learning_rate": 1e-2}}]})
+
+    assert [run["run_dir"] for run in runs] == ["runs/run_variant0_seed0", "runs/run_variant1_seed0"]
+    assert [run["algorithm_kwargs"]["learning_rate"] for run in runs] == [1e-3, 1e-2]
+
+
+def test_named_variants_keep_their_names():
+    runs = expand_runs({"name": "cartpole", "output_dir": "runs", "seeds": [0, 1],
+                        "runs": [{"name": "raw"}, {"name": "normalized"}]})
+
+    assert [run["run_dir"] for run in runs] == ["runs/raw_seed0", "runs/raw_seed1",
+                                                "runs/normalized_seed0", "runs/normalized_seed1"]
+
+
+@pytest.mark.parametrize("config", [{"seeds": [0, 0]}, {"runs": [{"name": "a"}, {"name": "a"}]}])
+def test_runs_sharing_a_directory_are_rejected(config):
+    with pytest.raises(ValueError):
+        expand_runs(config)
@@ -0,0 +1,40 @@
+# RL IMPLEMENTATIONS - IMPORT TIME TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks that the common entry points stay within their import time budget (see benchmarks.import_time)
+# and that the lazily loaded packages do not import their heavy dependencies until they are needed
+
+# IMPORTS #
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.import_time import IMPORT_BUDGETS, measure_import_time
+
+
+@pytest.mark.parametrize("statement", list(IMPORT_BUDGETS))
+def test_import_time_within_budget(statement):
+    import_time = measure_import_time(statement, 3)
+    assert import_time <= IMPORT_BUDGETS[statement], \
+        "{} takes {:.1f} ms (budget {:.1f} ms)".format(statement, import_time, IMPORT_BUDGETS[statement])
+
+
+def test_packages_do_not_import_heavy_dependencies():
+    statement = "import sys, main, memories, utils, rl_methods, rl_methods.policy_gradient; " \
+                "print(','.join(module for module in ('torch', 'gym', 'numpy') if module in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", statement], stdout=subprocess.PIPE,
+                            universal_newlines=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_lazy_attributes_are_cached_and_listed():
+    import memories
+
+    assert "ReplayBuffer" in dir(memories)
+    replay_buffer = memories.ReplayBuffer
+    assert vars(memories)["ReplayBuffer"] is replay_buffer
+
+    with pytest.raises(AttributeError):
+        memories.NotAnAttribute
@@ -0,0 +1,19 @@
+# RL IMPLEMENTATIONS - MAIN TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks that the command line entry point reports failed trainings through its exit code
+
+# IMPORTS #
+import json
+
+from main import main
+
+
+def test_failed_population_returns_an_error(tmp_path):
+    config_path = str(tmp_path / "config.json")
+    with open(config_path, "w") as config_file:
+        json.dump({"name": "pbt", "env": "NotAnEnvironment-v0", "total_epochs": 1, "steps_per_epoch": 10,
+                   "population": {"size": 2, "interval": 1}}, config_file)
+
+    assert main(["pbt", config_path, "--output-dir", str(tmp_path)]) == 1
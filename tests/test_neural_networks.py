@@ -0,0 +1,61 @@
+# RL IMPLEMENTATIONS - NEURAL NETWORK TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks that the fused actor-critic heads behave as separate policy and value layers
+
+# IMPORTS #
+import pytest
+import torch
+from torch import nn
+
+from rl_methods.neural_networks import actor_critic_mlp
+
+
+def separate_heads(network):
+    # Build the separate policy and value layers equivalent to the fused heads
+    policy_head = nn.Linear(network.heads.in_features, network.heads.out_features - 1)
+    value_head = nn.Linear(network.heads.in_features, 1)
+    with torch.no_grad():
+        policy_head.weight.copy_(network.heads.weight[:-1])
+        policy_head.bias.copy_(network.heads.bias[:-1])
+        value_head.weight.copy_(network.heads.weight[-1:])
+        value_head.bias.copy_(network.heads.bias[-1:])
+    return policy_head, value_head
+
+
+@pytest.mark.parametrize("detach_value", [False, True])
+def test_fused_heads_match_separate_layers(detach_value):
+    torch.manual_seed(0)
+    network = actor_critic_mlp(6, [16, 16], nn.Tanh, 3, nn.Identity, detach_value=detach_value)
+    policy_head, value_head = separate_heads(network)
+    observations = torch.randn(32, 6)
+
+    logits, values = network(observations)
+    features = network.torso(observations)
+
+    torch.testing.assert_close(logits, policy_head(features))
+    torch.testing.assert_close(values, value_head(features).squeeze(-1))
+
+
+def test_detached_value_does_not_train_the_torso():
+    torch.manual_seed(0)
+    network = actor_critic_mlp(6, [16], nn.Tanh, 3, nn.Identity, detach_value=True)
+
+    _, values = network(torch.randn(32, 6))
+    values.pow(2).mean().backward()
+
+    # Only the value row of the fused heads receives a gradient
+    assert all(parameter.grad is None for parameter in network.torso.parameters())
+    assert network.heads.weight.grad[-1].abs().sum() > 0
+    assert network.heads.weight.grad[:-1].abs().sum() == 0
+
+
+def test_attached_value_trains_the_torso():
+    torch.manual_seed(0)
+    network = actor_critic_mlp(6, [16], nn.Tanh, 3, nn.Identity)
+
+    _, values = network(torch.randn(32, 6))
+    values.pow(2).mean().backward()
+
+    assert all(parameter.grad is not None for parameter in network.torso.parameters())
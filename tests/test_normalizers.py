@@ -0,0 +1,96 @@
+# RL IMPLEMENTATIONS - NORMALIZER TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks that the running statistics are exact, regardless of how the values are split into batches
+
+# IMPORTS #
+import numpy as np
+
+from utils import RunningMeanStd, RewardNormalizer, discounted_cumsum, merge_statistics
+
+
+def test_merged_statistics_match_a_single_update():
+    values = np.random.default_rng(0).normal(3.0, 2.0, (1000, 4))
+
+    full = RunningMeanStd((4,))
+    full.update(values)
+
+    parts = []
+    for chunk in np.array_split(values, [10, 11, 500]):
+        stats = RunningMeanStd((4,))
+        stats.update(chunk)
+        parts.append(stats)
+    merged = merge_statistics(parts)
+
+    assert merged.count == full.count
+    np.testing.assert_allclose(merged.mean, full.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.var, full.var, rtol=1e-12)
+
+
+def test_batch_reward_update_matches_step_by_step_calls():
+    rng = np.random.default_rng(0)
+    rewards = rng.normal(size=300)
+    dones = rng.random(300) < 0.05
+
+    stepped, batched = RewardNormalizer(0.9), RewardNormalizer(0.9)
+    for reward, done in zip(rewards, dones):
+        stepped(reward, done)
+    batched.update(rewards[:120], dones[:120])
+    batched.update(rewards[120:], dones[120:])
+
+    assert batched.return_stats.count == stepped.return_stats.count
+    assert np.isclose(batched.discounted_return, stepped.discounted_return)
+    np.testing.assert_allclose(batched.return_stats.mean, stepped.return_stats.mean, rtol=1e-10)
+    np.testing.assert_allclose(batched.return_stats.var, stepped.return_stats.var, rtol=1e-10)
+    assert np.isclose(batched.scale, 1.0 / stepped.return_stats.std)
+
+
+def test_discounted_cumsum_matches_the_recurrence():
+    rng = np.random.default_rng(0)
+    rewards = rng.normal(size=1000)
+    # Short episodes, an episode longer than the doubling lags, and an episode ending at the last reward
+    dones = rng.random(1000) < 0.05
+    dones[300:900] = False
+    dones[-1] = True
+
+    for gamma in (0.0, 0.5, 0.99, 1.0):
+        expected = np.empty_like(rewards)
+        discounted_return = 2.0
+        for i, (reward, done) in enumerate(zip(rewards, dones)):
+            discounted_return = discounted_return * gamma + reward
+            expected[i] = discounted_return
+            if done:
+                discounted_return = 0.0
+
+        returns, last_return = discounted_cumsum(rewards, dones, gamma, initial_return=2.0)
+        np.testing.assert_allclose(returns, expected, rtol=1e-10, atol=1e-10)
+        assert last_return == 0.0
+
+        # The return is carried over when the sequence ends within an episode
+        _, last_return = discounted_cumsum(rewards[:-1], dones[:-1], gamma, initial_return=2.0)
+        assert np.isclose(last_return, expected[-2])
+
+
+def test_reward_normalizer_state_dict_restores_the_discounted_return():
+    rng = np.random.default_rng(0)
+    rewards = rng.normal(size=100)
+    dones = np.zeros(100, dtype=bool)
+
+    original = RewardNormalizer(0.9)
+    original.update(rewards[:60], dones[:60])
+    restored = RewardNormalizer(0.9)
+    restored.load_state_dict(original.state_dict())
+    assert restored.discounted_return == original.discounted_return != 0.0
+
+    # The restored normalizer continues the episode in the middle of which it was stored
+    original.update(rewards[60:], dones[60:])
+    restored.update(rewards[60:], dones[60:])
+    assert restored.discounted_return == original.discounted_return
+    np.testing.assert_allclose(restored.return_stats.var, original.return_stats.var)
+
+    # Dictionaries stored without the discounted return restart it
+    state_dict = original.state_dict()
+    del state_dict["discounted_return"]
+    restored.load_state_dict(state_dict)
+    assert restored.discounted_return == 0.0
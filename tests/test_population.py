@@ -0,0 +1,52 @@
+# RL IMPLEMENTATIONS - POPULATION BASED TRAINING TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the exploit step of the PBT controller, without starting any worker process
+
+# IMPORTS #
+import os
+
+import pytest
+
+from utils import PopulationBasedTraining
+
+
+class RecordingConnection:
+    """
+    Connection that records the messages sent by the controller, answering state requests with a fixed state
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self):
+        return {"state": len(self.sent)}
+
+
+def make_controller(tmp_path, fraction):
+    config = {"name": "pbt", "env": "CartPole-v1", "algorithm": "SimpleGradient", "output_dir": str(tmp_path),
+              "population": {"size": 4, "fraction": fraction}}
+    controller = PopulationBasedTraining(config)
+    os.makedirs(controller.directory, exist_ok=True)
+    return controller
+
+
+def test_workers_without_completed_episodes_are_replaced(tmp_path):
+    controller = make_controller(tmp_path, 0.25)
+    connections = [RecordingConnection() for _ in range(4)]
+    controller._exploit(connections, 4, [20.0, None, 35.0, 10.0])
+
+    # The best worker sends its state, and the worker without episodes is the one replaced
+    assert connections[2].sent[0] == ("send_state",)
+    assert [message[0] for message in connections[1].sent] == ["exploit"]
+    assert [message[0] for message in connections[3].sent] == ["continue"]
+    assert controller.lineage["generations"][0]["exploits"][0]["source"] == 2
+
+
+def test_fraction_above_half_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_controller(tmp_path, 0.6)
@@ -0,0 +1,75 @@
+# RL IMPLEMENTATIONS - REPLAY MEMORY TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the vectorized n-step sampling of the ReplayMemory against a step by step Python reference
+
+# IMPORTS #
+import numpy as np
+import pytest
+
+from memories import ReplayMemory, TransitionBatch
+
+
+def reference_n_step(memory, start, n_steps, gamma):
+    """
+    Computes the n-step return, discount and bootstrap index of an experience, one step at a time
+    """
+
+    newest = (memory.position - 1) % memory.capacity
+    n_step_return, index = 0.0, start
+    for step in range(n_steps):
+        index = (start + step) % memory.capacity
+        n_step_return += gamma ** step * memory.rewards[index]
+        if memory.episode_ends[index] or index == newest:
+            break
+
+    return n_step_return, gamma ** (step + 1), index
+
+
+def fill_memory(capacity, total_steps, seed):
+    """
+    Fills a memory with random episodes (both terminated and truncated), wrapping around the ring buffer
+    """
+
+    rng = np.random.default_rng(seed)
+    memory = ReplayMemory(capacity, seed=seed)
+    for step in range(total_steps):
+        final = rng.random() < 0.1
+        truncated = not final and rng.random() < 0.05
+        memory.insert_experience(np.full(3, step, dtype=np.float32), int(rng.integers(4)), float(rng.normal()),
+                                 np.full(3, step + 1, dtype=np.float32), final, truncated)
+
+    return memory
+
+
+@pytest.mark.parametrize("capacity, total_steps", [(100, 60), (100, 250), (37, 37)])
+def test_n_step_sampling_matches_reference(capacity, total_steps):
+    memory = fill_memory(capacity, total_steps, seed=capacity + total_steps)
+    n_steps, gamma = 5, 0.9
+
+    # The sampled starts are recovered from the states, which store the insertion step
+    batch, discounts, bootstrap_indices = memory.sample_n_step(256, n_steps, gamma)
+    starts = [int(np.flatnonzero(memory.states[:, 0] == state[0])[0]) for state in batch.states]
+
+    for i, start in enumerate(starts):
+        n_step_return, discount, bootstrap_index = reference_n_step(memory, start, n_steps, gamma)
+        assert batch.rewards[i] == pytest.approx(n_step_return, rel=1e-5, abs=1e-5)
+        assert discounts[i] == pytest.approx(discount, rel=1e-6)
+        assert bootstrap_indices[i] == bootstrap_index
+        assert np.array_equal(batch.next_states[i], memory.next_states[bootstrap_index])
+        assert batch.final_flags[i] == memory.final_flags[bootstrap_index]
+
+
+def test_insert_batch_matches_single_inserts():
+    single = fill_memory(50, 120, seed=0)
+    batched = ReplayMemory(50, seed=0)
+
+    # Insert the same experiences (the last 50 kept by the single memory, oldest first) as a batch
+    order = (single.position + np.arange(50)) % 50
+    batch = TransitionBatch(single.states[order], single.actions[order], single.rewards[order],
+                            single.next_states[order], single.final_flags[order])
+    batched.insert_batch(batch, single.episode_ends[order])
+
+    for name in ("states", "actions", "rewards", "next_states", "final_flags", "episode_ends"):
+        assert np.array_equal(getattr(batched, name), getattr(single, name)[order])
@@ -0,0 +1,195 @@
+# RL IMPLEMENTATIONS - SIMPLE GRADIENT TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the epoch handling of the policy gradient algorithms on a deterministic environment
+
+# IMPORTS #
+import copy
+import time
+
+import numpy as np
+import pytest
+import torch
+from gym.spaces import Box, Discrete
+
+from memories import TrajectoryWriter, TrajectoryDataset
+from rl_methods import SimpleGradient, Reinforce
+from utils import PolicyGradientLogger
+
+
+class FixedLengthEnv:
+    """
+    Environment whose episodes always last "length" steps, with a reward of 1 per step
+    """
+
+    def __init__(self, length=11, obs_size=4):
+        self.length = length
+        self.observation_space = Box(-1.0, 1.0, (obs_size,), np.float32)
+        self.action_space = Discrete(2)
+        self.rng = np.random.default_rng(0)
+        self.steps = 0
+
+    def reset(self, seed=None):
+        self.steps = 0
+        return self.rng.uniform(-1, 1, self.observation_space.shape).astype(np.float32), {}
+
+    def step(self, action):
+        self.steps += 1
+        observation = self.rng.uniform(-1, 1, self.observation_space.shape).astype(np.float32)
+        return observation, 1.0, self.steps == self.length, False, {}
+
+
+def train_metrics(algorithm, total_epochs, steps_per_epoch):
+    metrics = []
+    algorithm.train(total_epochs, steps_per_epoch, logger=PolicyGradientLogger(verbose=False),
+                    epoch_callback=lambda agent, epoch, optimizer, values: metrics.append(values))
+    return metrics
+
+
+@pytest.mark.parametrize("algorithm_class", [SimpleGradient, Reinforce])
+def test_logged_episode_reward_only_counts_full_episodes(algorithm_class):
+    torch.manual_seed(0)
+    metrics = train_metrics(algorithm_class(FixedLengthEnv(11)), 4, 50)
+
+    for values in metrics:
+        assert values["mean_episode_reward"] == 11.0
+
+    # Episodes cut off by the end of an epoch are only counted once, when they finish
+    assert sum(values["episodes"] for values in metrics) == sum(values["steps"] for values in metrics) // 11
+
+
+def test_episodes_without_value_function_are_never_cut():
+    torch.manual_seed(0)
+    agent = SimpleGradient(FixedLengthEnv(11))
+    agent._epoch(50)
+
+    # The last episode is run until it finishes, so all episodes are complete and unbiased
+    assert agent.replay_buffer.finished_length == 55
+    assert all(not episode.truncated for episode in agent.replay_buffer.episode_list)
+    assert agent.replay_buffer.episode_reward == [11.0] * 55
+
+
+def test_cut_episodes_are_bootstrapped_with_the_value_function():
+    torch.manual_seed(0)
+    agent = Reinforce(FixedLengthEnv(11))
+    agent._epoch(50)
+
+    last_episode = agent.replay_buffer.episode_list[-1]
+    assert agent.replay_buffer.finished_length == 50
+    assert last_episode.truncated and last_episode.continued
+    assert last_episode.bootstrap_value != 0.0
+
+
+def test_normalizers_are_updated_once_per_epoch_with_raw_experiences():
+    torch.manual_seed(0)
+    agent = Reinforce(FixedLengthEnv(11), normalize_observations=True, normalize_rewards=True)
+    train_metrics(agent, 2, 50)
+
+    # The experiences are stored raw, and the statistics include all experiences of both epochs
+    assert agent.replay_buffer.rewards == [1.0] * agent.replay_buffer.finished_length
+    assert agent.obs_normalizer.count == 100
+    assert agent.reward_normalizer.return_stats.count == 100
+
+
+def test_dataset_stores_raw_and_whole_episodes(tmp_path):
+    torch.manual_seed(0)
+    agent = Reinforce(FixedLengthEnv(11), normalize_rewards=True)
+    writer = TrajectoryWriter(str(tmp_path), shard_size=32)
+    agent.replay_buffer.episode_writer = writer
+    train_metrics(agent, 3, 50)
+    writer.close()
+
+    # Episodes cut off by an epoch are stored once, and only the episode cut off by the end of the training is shorter
+    dataset = TrajectoryDataset(str(tmp_path))
+    assert dataset.total_transitions == 150
+    assert dataset.episode_lengths.tolist() == [11] * 13 + [7]
+    assert dataset.episode_rewards.tolist() == [11.0] * 13 + [7.0]
+
+
+@pytest.mark.parametrize("algorithm_class", [SimpleGradient, Reinforce])
+def test_micro_batched_gradient_matches_full_batch(algorithm_class):
+    torch.manual_seed(0)
+    agent = algorithm_class(FixedLengthEnv(11), normalize_observations=True, normalize_rewards=True)
+    train_metrics(agent, 1, 50)
+    agent._epoch(200)
+    agent._update_normalizers(agent.replay_buffer)
+
+    # The same epoch is used to compute the full-batch gradient and the micro-batched one
+    gradients = []
+    for micro_batch_size in (None, 16):
+        copied_agent = copy.deepcopy(agent)
+        copied_agent.micro_batch_size = micro_batch_size
+        copied_agent._update(torch.optim.SGD(copied_agent.policy_net.parameters(), lr=0.0))
+        gradients.append(torch.cat([parameter.grad.flatten() for parameter in copied_agent.policy_net.parameters()]))
+
+    assert gradients[0].abs().max() > 1e-3
+    torch.testing.assert_close(gradients[1], gradients[0], rtol=1e-5, atol=1e-7)
+
+
+class SlowEnv(FixedLengthEnv):
+    """
+    FixedLengthEnv whose steps take some time, so the learner finishes its update before the collection
+    """
+
+    def step(self, action):
+        time.sleep(0.002)
+        return super().step(action)
+
+
+def pipelined_bootstrap_values(env, learner_delay=0.0):
+    torch.manual_seed(0)
+    agent = Reinforce(env, normalize_returns=True)
+
+    # Record the bootstrap values of each collected epoch
+    values = []
+    bootstrap_truncated_episodes = agent._bootstrap_truncated_episodes
+    update_return_normalizer = agent._update_return_normalizer
+
+    def record_bootstrap_values(replay_buffer, *args):
+        bootstrap_truncated_episodes(replay_buffer, *args)
+        values.append([episode.bootstrap_value for episode in replay_buffer.truncated_episodes()])
+
+    def delayed_update_return_normalizer(*args):
+        time.sleep(learner_delay)
+        update_return_normalizer(*args)
+
+    agent._bootstrap_truncated_episodes = record_bootstrap_values
+    agent._update_return_normalizer = delayed_update_return_normalizer
+    agent.train(4, 50, logger=PolicyGradientLogger(verbose=False), pipelined=True)
+    return values
+
+
+def test_pipelined_bootstrap_values_do_not_depend_on_thread_timing():
+    # The collector de-standardizes the values with its own snapshot, whether the learner updates
+    # the return statistics before (slow collection) or after (slow update) the bootstrap
+    values = pipelined_bootstrap_values(SlowEnv(11))
+    assert len(values) == 4 and all(epoch_values and 0.0 not in epoch_values for epoch_values in values)
+    assert pipelined_bootstrap_values(FixedLengthEnv(11), learner_delay=0.2) == values
+
+
+@pytest.mark.parametrize("algorithm_class", [SimpleGradient, Reinforce])
+def test_pipelined_training_matches_serial_counts(algorithm_class):
+    torch.manual_seed(0)
+    serial_metrics = train_metrics(algorithm_class(FixedLengthEnv(11)), 5, 50)
+
+    torch.manual_seed(0)
+    agent = algorithm_class(FixedLengthEnv(11))
+    pipelined_metrics, buffers = [], []
+
+    def record_epoch(algorithm, epoch, optimizer, metrics):
+        pipelined_metrics.append(metrics)
+        buffers.append(algorithm.replay_buffer)
+
+    agent.train(5, 50, logger=PolicyGradientLogger(verbose=False), pipelined=True, epoch_callback=record_epoch)
+
+    # The first epoch is collected with the initial policy, and the rest with the policy before the last update
+    assert [metrics["staleness"] for metrics in pipelined_metrics] == [0, 1, 1, 1, 1]
+
+    # Two buffers are swapped by reference, alternating between epochs
+    assert buffers[0] is not buffers[1]
+    assert all(buffer is buffers[epoch % 2] for epoch, buffer in enumerate(buffers))
+
+    # The same steps and episodes are performed as in serial training
+    for key in ("steps", "episodes", "mean_episode_reward"):
+        assert [metrics[key] for metrics in pipelined_metrics] == [metrics[key] for metrics in serial_metrics]
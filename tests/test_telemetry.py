@@ -0,0 +1,76 @@
+# RL IMPLEMENTATIONS - TELEMETRY TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the Prometheus exposition of the telemetry (text, file and HTTP endpoint) and the memory sizes it reports
+
+# IMPORTS #
+import urllib.request
+
+import numpy as np
+
+from memories import ReplayBuffer
+from utils import Telemetry
+
+
+def filled_replay_buffer(steps=20):
+    # Observations are views of a stacked frame array, as produced by frame stacking wrappers
+    frames = np.zeros((steps + 1, 84, 84), dtype=np.uint8)
+    replay_buffer = ReplayBuffer()
+    replay_buffer.start_episode()
+    for step in range(steps):
+        replay_buffer.insert_experience(frames[step], 0, 1.0, frames[step + 1])
+    replay_buffer.finish_episode(True)
+    return replay_buffer
+
+
+def test_memory_size_includes_the_data_of_array_views():
+    assert filled_replay_buffer(20).nbytes >= 20 * 84 * 84
+
+
+def test_prometheus_text_format():
+    telemetry = Telemetry()
+    telemetry.watch_memory("replay_buffer", filled_replay_buffer(20))
+    telemetry.count_steps(5)
+    telemetry.count_update(32)
+    telemetry.sample()
+    telemetry.count_steps(5)
+    metrics = telemetry.sample()
+
+    text = telemetry.to_prometheus()
+    lines = text.splitlines()
+    assert "# TYPE rl_env_steps_total counter" in lines
+    assert "rl_env_steps_total 10" in lines
+    assert "rl_gradient_updates_total 1" in lines
+    assert 'rl_memory_experiences{memory="replay_buffer"} 20' in lines
+    assert "rl_env_steps_per_second" in metrics
+
+    # Every sample line is preceded by its HELP and TYPE lines
+    for index, line in enumerate(lines):
+        if not line.startswith("#"):
+            name = line.split("{")[0].split(" ")[0]
+            assert any(previous == "# TYPE {} {}".format(name, metric_type)
+                       for previous in lines[:index] for metric_type in ("counter", "gauge"))
+
+
+def test_file_output(tmp_path):
+    file_path = str(tmp_path / "telemetry.prom")
+    telemetry = Telemetry(file_path=file_path)
+    telemetry.count_steps(3)
+    telemetry.sample()
+
+    with open(file_path) as metrics_file:
+        assert metrics_file.read() == telemetry.to_prometheus()
+    assert not (tmp_path / "telemetry.prom.tmp").exists()
+
+
+def test_http_endpoint():
+    with Telemetry(interval=0.05, port=0) as telemetry:
+        telemetry.count_steps(7)
+        telemetry.sample()
+        with urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(telemetry.port), timeout=5) as response:
+            assert response.status == 200
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode("utf-8")
+
+    assert "rl_env_steps_total 7" in body.splitlines()
@@ -0,0 +1,89 @@
+# RL IMPLEMENTATIONS - TRANSITION BATCH TESTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# Checks the construction, indexing, concatenation and conversion of transition batches
+
+# IMPORTS #
+import numpy as np
+import pytest
+import torch
+
+from memories import Experience, ReplayBuffer, TransitionBatch
+
+
+def filled_replay_buffer(steps=10):
+    replay_buffer = ReplayBuffer()
+    replay_buffer.start_episode()
+    for step in range(steps):
+        replay_buffer.insert_experience(np.full(3, step, dtype=np.uint8), step % 2, float(step),
+                                        np.full(3, step + 1, dtype=np.uint8))
+    replay_buffer.finish_episode(True)
+    return replay_buffer
+
+
+def test_partial_batches_keep_missing_elements_as_none():
+    batch = filled_replay_buffer().get_epoch_batch(0, 10, ("states", "actions"))
+
+    # Indexing, concatenation and conversion keep the missing elements as None
+    for result in (batch[3], batch[2:5], batch[np.array([1, 4])], TransitionBatch.concatenate([batch, batch]),
+                   batch.to("cpu")):
+        assert result.rewards is None and result.next_states is None and result.final_flags is None
+
+    assert len(batch[2:5]) == 3
+    assert isinstance(TransitionBatch.concatenate([batch, batch]).states, np.ndarray)
+    assert len(TransitionBatch.concatenate([batch, batch])) == 20
+    assert isinstance(TransitionBatch.concatenate([batch.to("cpu"), batch.to("cpu")]).actions, torch.Tensor)
+
+
+def make_batch(size=6):
+    return TransitionBatch.from_experiences([Experience(np.full(2, i, dtype=np.float64), i % 3, float(i),
+                                                        np.full(2, i + 1, dtype=np.float64), i == size - 1)
+                                             for i in range(size)])
+
+
+def test_batches_are_built_as_arrays_of_the_proper_type():
+    batch = make_batch()
+
+    assert len(batch) == 6
+    assert batch.states.shape == (6, 2) and batch.rewards.dtype == np.float32 and batch.final_flags.dtype == bool
+    assert batch.final_flags.tolist() == [False] * 5 + [True]
+
+
+def test_from_arrays_does_not_copy():
+    batch = make_batch()
+    rebuilt = TransitionBatch.from_arrays(*batch.as_tuple())
+
+    assert all(rebuilt_array is array for rebuilt_array, array in zip(rebuilt.as_tuple(), batch.as_tuple()))
+
+    with pytest.raises(ValueError):
+        TransitionBatch.from_arrays(batch.states, batch.actions[:3], batch.rewards, batch.next_states,
+                                    batch.final_flags)
+
+
+@pytest.mark.parametrize("index, expected", [(2, [2]), (np.int64(-1), [5]), (slice(1, 4), [1, 2, 3]),
+                                             (np.array([4, 0]), [4, 0]), (np.arange(6) % 2 == 0, [0, 2, 4])])
+def test_indexing_keeps_the_batch_dimension(index, expected):
+    result = make_batch()[index]
+
+    assert result.rewards.tolist() == [float(i) for i in expected]
+    assert result.states.shape == (len(expected), 2)
+
+
+def test_concatenate_preserves_the_order():
+    batch = make_batch()
+    concatenated = TransitionBatch.concatenate([batch[:2], batch[2:]])
+
+    for field in TransitionBatch.__slots__:
+        np.testing.assert_array_equal(getattr(concatenated, field), getattr(batch, field))
+
+
+def test_to_converts_all_elements_into_tensors():
+    batch = make_batch()
+    tensors = batch.to("cpu")
+
+    # Float64 states are converted into float32, and the rest of arrays are shared with the tensors
+    assert tensors.states.dtype == torch.float32
+    assert tensors.final_flags.dtype == torch.bool
+    assert tensors.rewards.data_ptr() == batch.rewards.ctypes.data
+    torch.testing.assert_close(tensors.actions, torch.as_tensor(batch.actions))
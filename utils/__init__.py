@@ -3,6 +3,32 @@ This module implements utility classes and functions utilized by the rest of the
 
 Currently, this module contains:
 * Loggers to print and store information about the current execution
+* Running normalizers for observations, rewards and returns
+* Experiment tools to launch and schedule training runs from configuration files
+* Telemetry of the resources and throughput of the training process
+* Population Based Training of several workers with perturbed hyperparameters
+
+All classes are imported lazily when first accessed
 """
 
-from .loggers import PolicyGradientLogger
+# IMPORTS
+from utils.lazy_imports import lazy_attributes
+
+# Lazily imported attributes, mapped to the submodule defining them
+_LAZY_ATTRIBUTES = {
+    "PolicyGradientLogger": ".loggers",
+    "RunningMeanStd": ".normalizers",
+    "RewardNormalizer": ".normalizers",
+    "merge_statistics": ".normalizers",
+    "discounted_cumsum": ".normalizers",
+    "load_config": ".experiments",
+    "schedule_runs": ".experiments",
+    "RunScheduler": ".experiments",
+    "Telemetry": ".telemetry",
+    "PopulationBasedTraining": ".population",
+    "run_population": ".population",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
@@ -0,0 +1,325 @@
+# RL IMPLEMENTATIONS - EXPERIMENTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# This file implements the tools used to launch training runs from configuration files:
+#   * Loading of configuration files (JSON or YAML)
+#   * Expansion of a configuration into individual runs (one per configuration variant and seed)
+#   * A scheduler running several runs concurrently within a single node, with a CPU core budget per run
+
+# IMPORTS #
+import copy
+import json
+import multiprocessing
+import os
+import random
+from multiprocessing.connection import wait
+from typing import List, Dict, Any
+
+# Default values of the configuration
+DEFAULT_CONFIG = {
+    # Name of the experiment, used to name the run directories
+    "name": "run",
+    # Id of the Gym environment
+    "env": "CartPole-v1",
+    # Name of the algorithm, as exported by rl_methods
+    "algorithm": "SimpleGradient",
+    # Additional keyword arguments for the algorithm constructor
+    "algorithm_kwargs": {},
+    # Training length
+    "total_epochs": 50,
+    "steps_per_epoch": 5000,
+    # Seeds to run. Each seed is a separate run
+    "seeds": [0],
+    # CPU cores assigned to each run
+    "cpus_per_run": 1,
+    # Directory containing all run directories
+    "output_dir": "runs",
+    # If True, all finished episodes are stored within the run directory ("trajectories")
+    "save_trajectories": False,
+    # Optional telemetry settings (for example, {"interval": 1.0, "port": 9100}). If specified, the resource
+    # and throughput metrics are written to "telemetry.prom" within the run directory (see utils.telemetry)
+    "telemetry": None,
+    # Optional list of configuration variants. Each variant overrides the base configuration,
+    # and is run for all seeds. Variants should have different names (unnamed variants are named by index)
+    "runs": [],
+}
+
+
+# CONFIGURATION METHODS
+
+def load_config(path):
+    """
+    Loads a configuration file. JSON files are always supported, while YAML files require PyYAML
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    dict
+    """
+
+    with open(path) as config_file:
+
+        # YAML files
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required to load YAML configuration files (pip install pyyaml)")
+            config = yaml.safe_load(config_file)
+
+        # JSON files
+        else:
+            config = json.load(config_file)
+
+    return config or {}
+
+
+def expand_runs(config):
+    """
+    Expands a configuration into the list of individual runs to perform.
+
+    Each variant in "runs" (or the base configuration, if there are no variants) is combined with
+    each seed. Every run has its own output directory, named after the variant and the seed.
+    Unnamed variants (when there are several) are named after their index within "runs"
+
+    Raises
+    ------
+    ValueError
+        If several runs would share the same output directory (repeated variant names or seeds)
+
+    Parameters
+    ----------
+    config: dict
+
+    Returns
+    -------
+    list[dict]
+    """
+
+    # Fill the missing values with the defaults
+    base_config = copy.deepcopy(DEFAULT_CONFIG)
+    base_config.update({key: value for key, value in config.items() if key != "runs"})
+    variants = config.get("runs") or [{}]
+
+    runs = []
+    for index, variant in enumerate(variants):
+
+        # Apply the overrides of the variant (algorithm arguments are merged instead of replaced)
+        variant_config = copy.deepcopy(base_config)
+        if len(variants) > 1 and "name" not in variant:
+            variant_config["name"] = "{}_variant{}".format(base_config["name"], index)
+        for key, value in variant.items():
+            if key == "algorithm_kwargs":
+                variant_config[key] = {**variant_config[key], **value}
+            else:
+                variant_config[key] = value
+
+        # Create a run for each seed
+        for seed in variant_config["seeds"]:
+            run = copy.deepcopy(variant_config)
+            run["seed"] = seed
+            run["run_dir"] = os.path.join(run["output_dir"], "{}_seed{}".format(run["name"], seed))
+            del run["seeds"]
+            runs.append(run)
+
+    # Runs sharing a directory would mix their metrics and overwrite their checkpoints
+    run_dirs = [run["run_dir"] for run in runs]
+    duplicates = sorted({run_dir for run_dir in run_dirs if run_dirs.count(run_dir) > 1})
+    if duplicates:
+        raise ValueError("Several runs share the same output directory: {}".format(", ".join(duplicates)))
+
+    return runs
+
+
+# RUN METHODS
+
+def run_training(run, cores=None, epoch_callback=None):
+    """
+    Performs a single training run: builds the environment and the algorithm, trains it
+    and stores the metrics and the final checkpoint within the run directory
+
+    Parameters
+    ----------
+    run: dict
+        Run configuration, as created by expand_runs
+    cores: list[int], optional
+        CPU cores assigned to the run. If specified, the process is pinned to these cores
+        and PyTorch uses one thread per core
+    epoch_callback: Callable, optional
+        Function called by the algorithm at the end of each epoch (see SimpleGradient.train)
+    """
+
+    # Limit the process to its CPU budget before PyTorch creates its thread pools
+    if cores:
+        for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[variable] = str(len(cores))
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+
+    # Heavy imports are performed within the run process
+    import gym
+    import numpy as np
+    import torch
+
+    import rl_methods
+    from memories import TrajectoryWriter
+    from utils import PolicyGradientLogger, Telemetry
+
+    if cores:
+        torch.set_num_threads(len(cores))
+
+    # Prepare the run directory, storing the configuration for reproducibility
+    os.makedirs(run["run_dir"], exist_ok=True)
+    with open(os.path.join(run["run_dir"], "config.json"), "w") as config_file:
+        json.dump(run, config_file, indent=4)
+
+    # Seed all sources of randomness
+    random.seed(run["seed"])
+    np.random.seed(run["seed"])
+    torch.manual_seed(run["seed"])
+
+    # Build the environment and the algorithm
+    # The environment is seeded by its first reset (later resets without a seed continue the same generator)
+    env = gym.make(run["env"])
+    env.reset(seed=run["seed"])
+    env.action_space.seed(run["seed"])
+    algorithm = getattr(rl_methods, run["algorithm"])(env, **run["algorithm_kwargs"])
+
+    # Stream the finished episodes into the run directory if necessary
+    writer = None
+    if run["save_trajectories"]:
+        writer = TrajectoryWriter(os.path.join(run["run_dir"], "trajectories"))
+        algorithm.replay_buffer.episode_writer = writer
+
+    # Sample the resource and throughput metrics in the background if necessary
+    telemetry = None
+    if run["telemetry"]:
+        telemetry = Telemetry(**{"file_path": os.path.join(run["run_dir"], "telemetry.prom"), **run["telemetry"]})
+        algorithm.telemetry = telemetry
+        telemetry.start()
+
+    # Train the algorithm and store the final checkpoint
+    # The metrics of a previous run in the same directory are discarded
+    metrics_path = os.path.join(run["run_dir"], "metrics.log")
+    open(metrics_path, "w").close()
+    logger = PolicyGradientLogger(metrics_path, verbose=False)
+    algorithm.train(run["total_epochs"], run["steps_per_epoch"], logger=logger, epoch_callback=epoch_callback)
+    algorithm.save(os.path.join(run["run_dir"], "checkpoint.pt"))
+
+    if telemetry is not None:
+        telemetry.stop()
+
+    if writer is not None:
+        writer.close()
+
+    env.close()
+
+
+# SCHEDULER
+class RunScheduler:
+    """
+    A RunScheduler runs several training runs concurrently within a single node.
+
+    Each run is performed in its own process, pinned to a disjoint set of CPU cores. Runs are launched
+    as soon as enough cores are free, so many small runs can be packed onto a single machine
+
+    Parameters
+    ----------
+    runs: list[dict]
+        Runs to perform, as created by expand_runs
+    total_cpus: int, optional
+        Total amount of CPU cores available for all runs. If not specified, all available cores are used
+    """
+
+    # ATTRIBUTES
+
+    # Runs to perform
+    runs: List[Dict[str, Any]]
+    # CPU cores available for the runs
+    available_cores: List[int]
+
+    # CONSTRUCTOR
+    def __init__(self, runs, total_cpus=None):
+
+        self.runs = runs
+
+        # Find the cores the scheduler is allowed to use
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+        self.available_cores = cores[:total_cpus] if total_cpus else cores
+
+    # METHODS
+    def run(self):
+        """
+        Performs all runs, launching each one as soon as its CPU budget is available
+
+        Returns
+        -------
+        dict[str, int]
+            Exit code of each run, by run directory
+        """
+
+        # Processes are spawned to avoid sharing PyTorch or Gym state with the scheduler
+        context = multiprocessing.get_context("spawn")
+
+        pending = list(self.runs)
+        free_cores = list(self.available_cores)
+        running = {}
+        exit_codes = {}
+
+        while pending or running:
+
+            # Launch all pending runs that fit within the free cores
+            # A run asking for more cores than available is given all cores of the node
+            while pending:
+                cpus = min(max(int(pending[0]["cpus_per_run"]), 1), len(self.available_cores))
+                if cpus > len(free_cores):
+                    break
+
+                run = pending.pop(0)
+                cores, free_cores = free_cores[:cpus], free_cores[cpus:]
+                process = context.Process(target=run_training, args=(run, cores), name=run["run_dir"])
+                process.start()
+                running[process.sentinel] = (process, run, cores)
+                print("Started run {} on cores {}".format(run["run_dir"], cores))
+
+            # Wait for any run to finish and release its cores
+            for sentinel in wait(list(running)):
+                process, run, cores = running.pop(sentinel)
+                process.join()
+                free_cores = sorted(free_cores + cores)
+                exit_codes[run["run_dir"]] = process.exitcode
+                print("Finished run {} (exit code {})".format(run["run_dir"], process.exitcode))
+
+        return exit_codes
+
+
+def schedule_runs(config, total_cpus=None, output_dir=None):
+    """
+    Expands a configuration into runs and performs all of them
+
+    Parameters
+    ----------
+    config: dict
+        Experiment configuration
+    total_cpus: int, optional
+        Total amount of CPU cores available for all runs
+    output_dir: str, optional
+        If specified, overrides the output directory of the configuration
+
+    Returns
+    -------
+    dict[str, int]
+        Exit code of each run, by run directory
+    """
+
+    if output_dir is not None:
+        config = {**config, "output_dir": output_dir}
+
+    return RunScheduler(expand_runs(config), total_cpus).run()
@@ -0,0 +1,46 @@
+# RL IMPLEMENTATIONS - LAZY IMPORTS
+#
+# Developed by Luna Jimenez Fernandez
+#
+# This file implements the lazy attribute loading shared by all packages of the repository (PEP 562):
+# the attributes of a package are mapped to the submodule defining them, and each submodule is only
+# imported when one of its attributes is first accessed
+
+# IMPORTS #
+import sys
+from importlib import import_module
+
+
+def lazy_attributes(module_name, attributes):
+    """
+    Creates the module-level __getattr__ and __dir__ functions of a package with lazily imported attributes.
+
+    Usage (within the __init__.py of the package):
+        __getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+
+    Parameters
+    ----------
+    module_name: str
+        Name of the package
+    attributes: dict[str, str]
+        Lazily imported attributes, mapped to the (relative) name of the submodule defining them
+
+    Returns
+    -------
+    (Callable, Callable)
+        __getattr__ and __dir__ functions of the package
+    """
+
+    def __getattr__(name):
+        # Import the submodule on first access and cache the attribute in the package
+        if name in attributes:
+            value = getattr(import_module(attributes[name], module_name), name)
+            setattr(sys.modules[module_name], name, value)
+            return value
+
+        raise AttributeError("module {!r} has no attribute {!r}".format(module_name, name))
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[module_name])) | set(attributes))
+
+    return __getattr__, __dir__
@@ -8,7 +8,9 @@
 #   * Store said information into a .log file
 
 # IMPORTS #
+import json
 import time
+from typing import Optional
 
 
 class BaseLogger:
@@ -61,5 +63,58 @@ class PolicyGradientLogger(BaseLogger):
 
     This logger, in addition to all BaseLogger functionality, includes the necessary methods
     to showcase the progress during training
+
+    Parameters
+    ----------
+    log_path: str, optional
+        If specified, the metrics of each epoch are also appended to this file (one JSON object per line)
+    verbose: bool
+        If True, the metrics of each epoch are printed
     """
 
+    # ATTRIBUTES
+
+    # Path of the file where the epoch metrics are stored. If None, the metrics are not stored
+    log_path: Optional[str]
+    # Whether the epoch metrics are printed or not
+    verbose: bool
+
+    # CONSTRUCTOR
+    def __init__(self, log_path=None, verbose=True):
+
+        super().__init__()
+
+        self.log_path = log_path
+        self.verbose = verbose
+
+    # METHODS
+    def log_epoch(self, epoch, **metrics):
+        """
+        Displays and stores the metrics of a finished epoch, alongside the epoch and total times
+
+        Parameters
+        ----------
+        epoch: int
+            Index of the finished epoch
+        metrics: Any
+            Metrics of the epoch (for example, the mean episode reward or the loss)
+
+        Returns
+        -------
+        dict
+            All the logged values
+        """
+
+        # Add the timing information to the metrics
+        epoch_time, total_time = self.timestamp()
+        values = {"epoch": epoch, **metrics, "epoch_time": epoch_time, "total_time": total_time}
+
+        if self.verbose:
+            print(" | ".join("{}: {:.4g}".format(key, value) if isinstance(value, float) else
+                             "{}: {}".format(key, value) for key, value in values.items()))
+
+        if self.log_path is not None:
+            with open(self.log_path, "a") as log_file:
+                log_file.write(json.dumps(values) + "\n")
+
+        return values
@@ -0,0 +1,419 @@
+# RL IMPLEMENTATIONS - NORMALIZERS
+#
+# Developed by Luna Jimenez Fernandez
+# Based on OpenAI Spin Up
+#
+# This file implements running normalizers, used to scale the inputs and targets of the RL algorithms:
+#   * Running mean / variance statistics, updated by batches (Welford / Chan parallel algorithm)
+#   * Observation normalizers (standardization of the observations)
+#   * Reward normalizers (scaling of the rewards by the deviation of the discounted return)
+#   * Return normalizers (standardization of the returns used as gradient weights)
+
+# IMPORTS #
+from typing import Tuple, Optional
+
+import numpy as np
+
+
+class RunningMeanStd:
+    """
+    Running mean and variance of a stream of values, updated by batches.
+
+    Batches are reduced with NumPy and then combined with the stored statistics using the parallel
+    algorithm by Chan et al. (Welford's algorithm being the special case of batches of size 1).
+    Since the combination is exact, statistics computed separately (for example, by several actor processes)
+    can be merged into the same statistics that would have been obtained by a single process.
+
+    Parameters
+    ----------
+    shape: tuple[int, ...]
+        Shape of a single value (for example, the observation shape). Scalars use an empty tuple
+    epsilon: float
+        Small constant added to the variance to avoid divisions by zero
+    clip: float, optional
+        If specified, normalized values are clipped to the range [-clip, clip]
+    """
+
+    # ATTRIBUTES #
+
+    # Running mean of the values
+    mean: np.ndarray
+    # Running (population) variance of the values
+    var: np.ndarray
+    # Total amount of values seen
+    count: int
+
+    # Shape of a single value
+    shape: Tuple[int, ...]
+    # Constant added to the variance to avoid divisions by zero
+    epsilon: float
+    # Clipping range of the normalized values
+    clip: Optional[float]
+
+    # CONSTRUCTOR #
+    def __init__(self, shape=(), epsilon=1e-8, clip=None):
+
+        # Store the parameters
+        self.shape = tuple(shape)
+        self.epsilon = epsilon
+        self.clip = clip
+
+        # Statistics start empty
+        self.mean = np.zeros(self.shape, dtype=np.float64)
+        self.var = np.ones(self.shape, dtype=np.float64)
+        self.count = 0
+
+    # PROPERTIES #
+    @property
+    def std(self):
+        """
+        Standard deviation of the values, including epsilon
+
+        Returns
+        -------
+        np.ndarray
+        """
+
+        return np.sqrt(self.var + self.epsilon)
+
+    # METHODS #
+
+    # Statistics update
+    def update(self, values):
+        """
+        Updates the statistics with a batch of values, stacked along the first axis.
+
+        A single value (with the same shape as the normalizer) is also accepted
+
+        Parameters
+        ----------
+        values: np.ndarray or list
+        """
+
+        # Stack the values as a batch along the first axis
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape == self.shape:
+            values = values.reshape((1,) + self.shape)
+
+        # Ignore empty batches
+        if values.shape[0] == 0:
+            return
+
+        # Reduce the batch and combine the moments
+        self.update_from_moments(values.mean(axis=0), values.var(axis=0), values.shape[0])
+
+    def update_from_moments(self, batch_mean, batch_var, batch_count):
+        """
+        Combines the stored statistics with the moments of another set of values (Chan et al.)
+
+        Parameters
+        ----------
+        batch_mean: np.ndarray
+            Mean of the values
+        batch_var: np.ndarray
+            Population variance of the values
+        batch_count: int
+            Number of values
+        """
+
+        # Nothing to combine
+        if batch_count == 0:
+            return
+
+        # If the statistics are empty, the moments are copied as they are
+        if self.count == 0:
+            self.mean = np.array(batch_mean, dtype=np.float64).reshape(self.shape)
+            self.var = np.array(batch_var, dtype=np.float64).reshape(self.shape)
+            self.count = batch_count
+            return
+
+        # Combine both sets of moments through the sum of squared differences (M2)
+        total_count = self.count + batch_count
+        delta = batch_mean - self.mean
+        m2 = self.var * self.count + batch_var * batch_count + np.square(delta) * self.count * batch_count / total_count
+
+        self.mean = self.mean + delta * batch_count / total_count
+        self.var = m2 / total_count
+        self.count = total_count
+
+    def merge(self, other):
+        """
+        Merges the statistics of another normalizer (for example, from another actor process) into this one
+
+        Parameters
+        ----------
+        other: RunningMeanStd
+        """
+
+        self.update_from_moments(other.mean, other.var, other.count)
+
+    # Normalization
+    def normalize(self, values, out=None, center=True):
+        """
+        Normalizes the values using the current statistics.
+
+        Parameters
+        ----------
+        values: np.ndarray
+            Values to normalize
+        out: np.ndarray, optional
+            If specified, the result is written into this array (which may be "values" itself) without
+            allocating a new one. Must be a floating point array
+        center: bool
+            If False, the values are only scaled by the standard deviation (and not centered)
+
+        Returns
+        -------
+        np.ndarray
+        """
+
+        # Center and scale the values, reusing the output array for all operations
+        if center:
+            out = np.subtract(values, self.mean, out=out, casting="unsafe")
+            np.divide(out, self.std, out=out, casting="unsafe")
+        else:
+            out = np.divide(values, self.std, out=out, casting="unsafe")
+
+        # Clip the values if necessary
+        if self.clip is not None:
+            np.clip(out, -self.clip, self.clip, out=out)
+
+        return out
+
+    # Serialization
+    def state_dict(self):
+        """
+        Returns the statistics as a dictionary, to be stored alongside the model
+
+        Returns
+        -------
+        dict
+        """
+
+        # Arrays are stored as lists, so the dictionary can be saved and loaded with torch.save / torch.load
+        return {"mean": self.mean.tolist(), "var": self.var.tolist(), "count": self.count}
+
+    def load_state_dict(self, state_dict):
+        """
+        Restores the statistics from a dictionary created by state_dict
+
+        Parameters
+        ----------
+        state_dict: dict
+        """
+
+        self.mean = np.array(state_dict["mean"], dtype=np.float64).reshape(self.shape)
+        self.var = np.array(state_dict["var"], dtype=np.float64).reshape(self.shape)
+        self.count = int(state_dict["count"])
+
+
+class RewardNormalizer:
+    """
+    Scales the rewards by the running standard deviation of the discounted return.
+
+    The rewards are not centered, since shifting the rewards would change the optimal policy
+    of environments with variable episode lengths
+
+    Parameters
+    ----------
+    gamma: float
+        Discount factor used to compute the discounted return
+    epsilon: float
+        Small constant added to the variance to avoid divisions by zero
+    clip: float, optional
+        If specified, scaled rewards are clipped to the range [-clip, clip]
+    """
+
+    # ATTRIBUTES #
+
+    # Running statistics of the discounted returns
+    return_stats: RunningMeanStd
+    # Discount factor
+    gamma: float
+    # Discounted return of the current episode
+    discounted_return: float
+
+    # CONSTRUCTOR #
+    def __init__(self, gamma=0.99, epsilon=1e-8, clip=None):
+
+        self.return_stats = RunningMeanStd((), epsilon, clip)
+        self.gamma = gamma
+        self.discounted_return = 0.0
+
+    # PROPERTIES #
+    @property
+    def scale(self):
+        """
+        Factor applied to the rewards by the current statistics (1 until at least two returns have been observed).
+
+        Clipping is not included, since it depends on each reward
+
+        Returns
+        -------
+        float
+        """
+
+        if self.return_stats.count < 2:
+            return 1.0
+
+        return float(1.0 / self.return_stats.std)
+
+    # METHODS #
+    def update(self, rewards, dones):
+        """
+        Updates the running statistics with a batch of consecutive rewards at once,
+        obtaining the same statistics as calling the normalizer with each reward
+
+        Parameters
+        ----------
+        rewards: np.ndarray or list[float]
+            Consecutive rewards
+        dones: np.ndarray or list[bool]
+            Whether the episode ended after each reward
+        """
+
+        # Accumulate the discounted return of each step, resetting it at the end of each episode
+        returns, self.discounted_return = discounted_cumsum(rewards, dones, self.gamma, self.discounted_return)
+        self.return_stats.update(returns)
+
+    def __call__(self, reward, done=False):
+        """
+        Updates the running statistics with a new reward and returns it scaled
+
+        Parameters
+        ----------
+        reward: float
+            Reward obtained in the current step
+        done: bool
+            Whether the episode ended in the current step
+
+        Returns
+        -------
+        float
+        """
+
+        # Accumulate the discounted return and update the statistics
+        self.discounted_return = self.discounted_return * self.gamma + reward
+        self.return_stats.update(self.discounted_return)
+
+        # The discounted return is reset at the end of each episode
+        if done:
+            self.discounted_return = 0.0
+
+        # The variance is not meaningful until at least two returns have been observed
+        if self.return_stats.count < 2:
+            return float(reward)
+
+        return float(self.return_stats.normalize(reward, center=False))
+
+    def merge(self, other):
+        """
+        Merges the statistics of another reward normalizer into this one
+
+        Parameters
+        ----------
+        other: RewardNormalizer
+        """
+
+        self.return_stats.merge(other.return_stats)
+
+    def state_dict(self):
+        """
+        Returns the statistics (and the discounted return of the current episode) as a dictionary,
+        to be stored alongside the model
+
+        Returns
+        -------
+        dict
+        """
+
+        return {**self.return_stats.state_dict(), "discounted_return": self.discounted_return}
+
+    def load_state_dict(self, state_dict):
+        """
+        Restores the statistics from a dictionary created by state_dict
+
+        Parameters
+        ----------
+        state_dict: dict
+        """
+
+        self.return_stats.load_state_dict(state_dict)
+
+        # Dictionaries stored before the discounted return was included restart it
+        self.discounted_return = float(state_dict.get("discounted_return", 0.0))
+
+
+# STATIC METHODS
+
+def merge_statistics(statistics):
+    """
+    Merges a list of running statistics (for example, one per actor process) into a single new one
+
+    Parameters
+    ----------
+    statistics: list[RunningMeanStd]
+
+    Returns
+    -------
+    RunningMeanStd
+    """
+
+    # The result takes the parameters of the first statistics
+    merged = RunningMeanStd(statistics[0].shape, statistics[0].epsilon, statistics[0].clip)
+    for stats in statistics:
+        merged.merge(stats)
+
+    return merged
+
+
+def discounted_cumsum(rewards, dones, gamma, initial_return=0.0):
+    """
+    Computes the discounted return accumulated at each step of a sequence of consecutive rewards
+    (G_t = gamma * G_t-1 + r_t), restarting it after the end of each episode.
+
+    The recurrence is solved as a parallel prefix scan with doubling lags: after adding gamma^lag * G_t-lag
+    (within the same episode) for lag = 1, 2, 4..., each return contains all the rewards of its episode
+    up to twice the lag before. This takes log2 of the episode length vectorized passes (fewer when gamma^lag
+    becomes negligible). Unlike a cumulative sum of gamma^-t * r_t, it only multiplies by powers of gamma,
+    so intermediate values stay bounded for any discount factor
+
+    Parameters
+    ----------
+    rewards: np.ndarray or list[float]
+        Consecutive rewards
+    dones: np.ndarray or list[bool]
+        Whether the episode ended after each reward
+    gamma: float
+        Discount factor
+    initial_return: float
+        Discounted return accumulated before the first reward
+
+    Returns
+    -------
+    (np.ndarray, float)
+        Discounted return at each step, and discounted return continued by the next reward
+        (0 if the last reward ended an episode)
+    """
+
+    returns = np.array(rewards, dtype=np.float64)
+    dones = np.asarray(dones, dtype=bool)
+    if len(returns) == 0:
+        return returns, initial_return
+
+    # Episode of each step (a new episode starts after each episode end), and longest episode segment
+    episodes = np.concatenate([[0], np.cumsum(dones[:-1])])
+    segment_ends = np.flatnonzero(np.diff(episodes, append=episodes[-1] + 1))
+    longest_segment = np.max(np.diff(segment_ends, prepend=-1))
+
+    lag = 1
+    while lag < longest_segment and gamma ** lag >= np.finfo(np.float64).eps:
+        same_episode = episodes[lag:] == episodes[:-lag]
+        returns[lag:] += np.where(same_episode, gamma ** lag * returns[:-lag], 0.0)
+        lag *= 2
+
+    # The initial return is only continued by the first episode of the sequence
+    first_episode = episodes == 0
+    returns[first_episode] += gamma ** np.arange(1, np.count_nonzero(first_episode) + 1) * initial_return
+
+    return returns, 0.0 if dones[-1] else float(returns[-1])
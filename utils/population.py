@@ -0,0 +1,436 @@
+# RL IMPLEMENTATIONS - POPULATION BASED TRAINING
+#
+# Developed by Luna Jimenez Fernandez
+#
+# This file implements Population Based Training (PBT, Jaderberg et al. 2017) on top of the training runs:
+#   * A population of workers (one process per worker) trains the same algorithm with different hyperparameters
+#   * Every few epochs, all workers are ranked by the mean return of their recently completed episodes
+#   * The worst workers are replaced by a copy of the best workers (network weights, optimizer state and
+#     normalizer statistics), sent between processes through shared memory, and their hyperparameters perturbed
+#   * The lineage of all workers (scores, hyperparameters and copies) is recorded, so the population can be reproduced
+
+# IMPORTS #
+import copy
+import json
+import math
+import os
+from typing import List, Dict, Any
+
+import numpy as np
+
+from utils.experiments import expand_runs, run_training
+
+# Default values of the "population" section of the configuration
+DEFAULT_POPULATION = {
+    # Amount of workers in the population
+    "size": 4,
+    # Epochs trained between consecutive exploit steps
+    "interval": 5,
+    # Fraction of the population replaced (worst workers) and copied (best workers) in each exploit step.
+    # At most 0.5, so no worker is both one of the best and one of the worst
+    "fraction": 0.25,
+    # Factors randomly applied to each hyperparameter of a replaced worker
+    "perturb_factors": [0.8, 1.2],
+    # Probability of resampling each hyperparameter from its range instead of perturbing it
+    "resample_probability": 0.25,
+    # Range [min, max] of each tuned hyperparameter (constructor arguments and attributes of the algorithm).
+    # Initial values are sampled log-uniformly within the range, and perturbed values are clipped to it
+    "hyperparameters": {"learning_rate": [1e-4, 1e-2]},
+}
+
+# Name of the lineage file within the population directory
+LINEAGE_FILE = "lineage.json"
+
+
+# WORKER METHODS
+
+def _clone_state(state):
+    """
+    Copies all tensors of a (nested) state dictionary, so the copy does not change while the worker keeps training
+
+    Parameters
+    ----------
+    state: Any
+
+    Returns
+    -------
+    Any
+    """
+
+    if isinstance(state, dict):
+        return {key: _clone_state(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(_clone_state(value) for value in state)
+    if hasattr(state, "clone"):
+        return state.clone()
+
+    return copy.deepcopy(state)
+
+
+def _set_hyperparameters(algorithm, optimizer, hyperparameters):
+    """
+    Applies new hyperparameter values to an algorithm (and to its optimizer, for the learning rate)
+
+    Parameters
+    ----------
+    algorithm: SimpleGradient
+    optimizer: Optimizer
+    hyperparameters: dict[str, float]
+    """
+
+    for name, value in hyperparameters.items():
+        setattr(algorithm, name, value)
+
+        if name == "learning_rate":
+            for group in optimizer.param_groups:
+                group["lr"] = value
+
+
+def population_worker(run, cores, connection, interval):
+    """
+    Performs the training run of a population worker, synchronizing with the controller every "interval" epochs.
+
+    At each synchronization, the worker reports its score (mean return of the episodes completed within the last
+    "interval" epochs, or None if no episode was completed) and waits for the decision of the controller:
+        * ("send_state",): the worker sends a copy of its state (the worker is one of the best)
+        * ("exploit", state, hyperparameters): the worker loads the state of a better worker and its new hyperparameters
+        * ("continue",): the worker continues training as it is
+
+    Tensors sent through the connection are moved to shared memory, so only their handles are pickled
+
+    Parameters
+    ----------
+    run: dict
+        Run configuration of the worker
+    cores: list[int]
+        CPU cores assigned to the worker
+    connection: Connection
+        Connection with the controller
+    interval: int
+        Epochs trained between synchronizations
+    """
+
+    # Imported within the worker process, so tensors are shared through shared memory
+    import torch.multiprocessing  # noqa: F401
+
+    # Sum of the returns and amount of the episodes completed within each epoch
+    episode_returns, episode_counts = [], []
+
+    def synchronize(algorithm, epoch, optimizer, metrics):
+        # Epochs without completed episodes log a NaN mean, and are not counted
+        episode_counts.append(metrics["episodes"])
+        episode_returns.append(metrics["mean_episode_reward"] * metrics["episodes"] if metrics["episodes"] else 0.0)
+
+        # Synchronize every interval epochs, except after the last epoch
+        if (epoch + 1) % interval != 0 or epoch + 1 == run["total_epochs"]:
+            return
+
+        completed = sum(episode_counts[-interval:])
+        score = sum(episode_returns[-interval:]) / completed if completed else None
+        connection.send(("ready", epoch, score))
+        while True:
+            message = connection.recv()
+
+            if message[0] == "send_state":
+                connection.send(_clone_state({"algorithm": algorithm.state_dict(),
+                                              "optimizer": optimizer.state_dict()}))
+
+            elif message[0] == "exploit":
+                _, state, hyperparameters = message
+                algorithm.load_state_dict(state["algorithm"])
+                optimizer.load_state_dict(state["optimizer"])
+                _set_hyperparameters(algorithm, optimizer, hyperparameters)
+                return
+
+            else:
+                return
+
+    run_training(run, cores, epoch_callback=synchronize)
+    connection.send(("done",))
+
+
+# CONTROLLER
+class PopulationBasedTraining:
+    """
+    A PopulationBasedTraining controller trains a population of workers concurrently, each one in its own process.
+
+    All workers train the same algorithm and environment with different hyperparameters. Every "interval" epochs,
+    the workers are ranked by the mean return of the episodes completed within their last "interval" epochs
+    (workers without completed episodes are ranked last). Each worker within the worst "fraction" of the
+    population is replaced by a randomly chosen worker within the best "fraction": the network, optimizer and
+    normalizer states are copied from the best worker through shared memory, and the hyperparameters are
+    perturbed (multiplied by a random factor, or resampled from their range).
+
+    All decisions are recorded in the lineage file (lineage.json) of the population directory, alongside the seed
+    and initial hyperparameters of each worker
+
+    Parameters
+    ----------
+    config: dict
+        Experiment configuration (see utils.experiments), with an additional "population" section
+        (see DEFAULT_POPULATION). Variants are not used, and worker i is seeded with the first seed plus i
+    total_cpus: int, optional
+        Total amount of CPU cores available for all workers. If there are less cores than required,
+        workers share cores
+    """
+
+    # ATTRIBUTES
+
+    # Run configuration of each worker
+    runs: List[Dict[str, Any]]
+    # Population parameters
+    population: Dict[str, Any]
+    # Directory containing the worker directories and the lineage
+    directory: str
+    # CPU cores available for the workers
+    available_cores: List[int]
+    # Random generator used for the selection and the perturbations
+    rng: np.random.Generator
+
+    # Current hyperparameters of each worker
+    hyperparameters: List[Dict[str, float]]
+    # Lineage of the population
+    lineage: Dict[str, Any]
+
+    # CONSTRUCTOR
+    def __init__(self, config, total_cpus=None):
+
+        self.population = {**DEFAULT_POPULATION, **config.get("population", {})}
+        if not 0 < self.population["fraction"] <= 0.5:
+            raise ValueError("population fraction must be within (0, 0.5], got {}".format(self.population["fraction"]))
+        base_run = expand_runs({**config, "runs": []})[0]
+        self.directory = os.path.join(base_run["output_dir"], base_run["name"])
+        self.rng = np.random.default_rng(base_run["seed"])
+
+        # Find the cores the controller is allowed to use
+        if hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+        else:
+            cores = list(range(os.cpu_count() or 1))
+        self.available_cores = cores[:total_cpus] if total_cpus else cores
+
+        # Create the run of each worker, with its own seed and initial hyperparameters
+        self.runs = []
+        self.hyperparameters = []
+        for worker in range(self.population["size"]):
+            hyperparameters = {name: self._sample(name) for name in self.population["hyperparameters"]}
+
+            run = copy.deepcopy(base_run)
+            run["seed"] = base_run["seed"] + worker
+            run["run_dir"] = os.path.join(self.directory, "worker{}".format(worker))
+            run["algorithm_kwargs"] = {**run["algorithm_kwargs"], **hyperparameters}
+
+            self.runs.append(run)
+            self.hyperparameters.append(hyperparameters)
+
+        self.lineage = {"population": self.population, "seed": base_run["seed"],
+                        "workers": [{"run_dir": run["run_dir"], "seed": run["seed"], "hyperparameters": hyperparameters}
+                                    for run, hyperparameters in zip(self.runs, self.hyperparameters)],
+                        "generations": []}
+
+    # METHODS
+    def run(self):
+        """
+        Trains the population, performing an exploit step every interval epochs
+
+        Returns
+        -------
+        dict
+            Lineage of the population
+
+        Raises
+        ------
+        RuntimeError
+            If any worker fails
+        """
+
+        # Tensors received from the workers are rebuilt from shared memory
+        import torch.multiprocessing
+
+        context = torch.multiprocessing.get_context("spawn")
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_lineage()
+
+        # Start all workers, sharing the cores if there are not enough
+        cpus = max(int(self.runs[0]["cpus_per_run"]), 1)
+        processes, connections = [], []
+        for worker, run in enumerate(self.runs):
+            cores = [self.available_cores[(worker * cpus + i) % len(self.available_cores)] for i in range(cpus)]
+            controller_end, worker_end = context.Pipe()
+            process = context.Process(target=population_worker, name=run["run_dir"],
+                                      args=(run, sorted(set(cores)), worker_end, self.population["interval"]))
+            process.start()
+            # The controller only keeps its own end, so the connection is closed if the worker stops
+            worker_end.close()
+            processes.append(process)
+            connections.append(controller_end)
+            print("Started worker {} on cores {}".format(run["run_dir"], sorted(set(cores))))
+
+        try:
+            # Perform an exploit step every time all workers are ready, until all of them finish
+            while True:
+                messages = [self._receive(connection) for connection in connections]
+                if all(message[0] == "done" for message in messages):
+                    break
+                self._exploit(connections, messages[0][1], [message[2] for message in messages])
+
+        # If any worker fails, the rest of the population is stopped
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+
+        finally:
+            for process in processes:
+                process.join()
+
+        # Workers may also fail after reporting that they are done
+        failed = [process.name for process in processes if process.exitcode != 0]
+        if failed:
+            raise RuntimeError("Population workers failed: {}".format(", ".join(failed)))
+
+        return self.lineage
+
+    # HELPER METHODS
+    def _exploit(self, connections, epoch, scores):
+        """
+        Replaces the worst workers by perturbed copies of the best workers, and records the decisions
+
+        Parameters
+        ----------
+        connections: list[Connection]
+            Connection with each worker (all of them waiting for a decision)
+        epoch: int
+            Epoch reached by the workers
+        scores: list[float or None]
+            Score of each worker (None if the worker did not complete any episode)
+        """
+
+        # Rank the workers, from best to worst
+        ranking = sorted(range(len(scores)), key=lambda worker: -math.inf if scores[worker] is None else scores[worker],
+                         reverse=True)
+        replaced = max(1, int(math.ceil(len(ranking) * self.population["fraction"]))) if len(ranking) > 1 else 0
+        best, worst = ranking[:replaced], ranking[len(ranking) - replaced:]
+
+        # Choose the source of each replaced worker, and obtain the state of each source
+        sources = {worker: int(self.rng.choice(best)) for worker in worst}
+        states = {}
+        for source in sorted(set(sources.values())):
+            connections[source].send(("send_state",))
+            states[source] = self._receive(connections[source])
+
+        # Replace the worst workers, and let the rest continue
+        exploits = []
+        for worker, connection in enumerate(connections):
+            if worker in sources:
+                source = sources[worker]
+                hyperparameters = self._perturb(self.hyperparameters[source])
+                connection.send(("exploit", states[source], hyperparameters))
+                exploits.append({"worker": worker, "source": source, "hyperparameters": hyperparameters})
+                self.hyperparameters[worker] = hyperparameters
+            else:
+                connection.send(("continue",))
+
+        self.lineage["generations"].append({"epoch": epoch, "scores": scores, "exploits": exploits,
+                                            "hyperparameters": copy.deepcopy(self.hyperparameters)})
+        self._write_lineage()
+
+        print("Epoch {}: best worker {} ({}), replaced workers {}".format(
+            epoch, ranking[0], "no episodes" if scores[ranking[0]] is None else "{:.4g}".format(scores[ranking[0]]),
+            sorted(sources)))
+
+    def _sample(self, name):
+        """
+        Samples a hyperparameter log-uniformly within its range
+
+        Parameters
+        ----------
+        name: str
+
+        Returns
+        -------
+        float
+        """
+
+        low, high = self.population["hyperparameters"][name]
+        return float(np.exp(self.rng.uniform(np.log(low), np.log(high))))
+
+    def _perturb(self, hyperparameters):
+        """
+        Perturbs the hyperparameters of a worker: each one is either resampled from its range or multiplied
+        by a random perturbation factor (and clipped to its range)
+
+        Parameters
+        ----------
+        hyperparameters: dict[str, float]
+
+        Returns
+        -------
+        dict[str, float]
+        """
+
+        perturbed = {}
+        for name, value in hyperparameters.items():
+            low, high = self.population["hyperparameters"][name]
+
+            if self.rng.random() < self.population["resample_probability"]:
+                perturbed[name] = self._sample(name)
+            else:
+                factor = float(self.rng.choice(self.population["perturb_factors"]))
+                perturbed[name] = float(np.clip(value * factor, low, high))
+
+        return perturbed
+
+    @staticmethod
+    def _receive(connection):
+        """
+        Receives a message from a worker, failing if the worker stopped unexpectedly
+
+        Parameters
+        ----------
+        connection: Connection
+
+        Returns
+        -------
+        Any
+        """
+
+        try:
+            return connection.recv()
+        except EOFError:
+            raise RuntimeError("A population worker stopped unexpectedly")
+
+    def _write_lineage(self):
+        """
+        Writes the lineage file, replacing the previous one atomically
+        """
+
+        lineage_path = os.path.join(self.directory, LINEAGE_FILE)
+        with open(lineage_path + ".tmp", "w") as lineage_file:
+            json.dump(self.lineage, lineage_file, indent=4)
+        os.replace(lineage_path + ".tmp", lineage_path)
+
+
+def run_population(config, total_cpus=None, output_dir=None):
+    """
+    Trains a population of workers with Population Based Training
+
+    Parameters
+    ----------
+    config: dict
+        Experiment configuration, with a "population" section
+    total_cpus: int, optional
+        Total amount of CPU cores available for all workers
+    output_dir: str, optional
+        If specified, overrides the output directory of the configuration
+
+    Returns
+    -------
+    dict
+        Lineage of the population
+    """
+
+    if output_dir is not None:
+        config = {**config, "output_dir": output_dir}
+
+    return PopulationBasedTraining(config, total_cpus).run()
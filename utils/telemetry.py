@@ -0,0 +1,400 @@
+# RL IMPLEMENTATIONS - TELEMETRY
+#
+# Developed by Luna Jimenez Fernandez
+#
+# This file implements the resource and throughput telemetry of the training process:
+#   * Counters of environment steps and gradient updates, incremented by the algorithms
+#   * A background thread sampling the throughput, the occupancy of the replay memories, the process
+#     memory (RSS) and the CPU usage of the PyTorch threads at a fixed rate
+#   * Exposure of the latest sample in the Prometheus text format, either through a local HTTP endpoint
+#     or through a file rewritten after each sample
+#
+# The training loop only increments counters, while all measurements are performed by the background thread,
+# so the cost of the telemetry within each step is negligible
+
+# IMPORTS #
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Name, type and description of each process-wide metric
+METRICS = (
+    ("rl_env_steps_total", "counter", "Environment steps performed"),
+    ("rl_env_steps_per_second", "gauge", "Environment steps per second since the previous sample"),
+    ("rl_gradient_updates_total", "counter", "Gradient updates (optimizer steps) performed"),
+    ("rl_gradient_updates_per_second", "gauge", "Gradient updates per second since the previous sample"),
+    ("rl_update_samples_per_second", "gauge", "Experiences used by the gradient updates per second"),
+    ("rl_process_resident_memory_bytes", "gauge", "Resident memory (RSS) of the process"),
+    ("rl_process_cpu_seconds_total", "counter", "CPU time used by the process"),
+    ("rl_torch_threads", "gauge", "Threads used by PyTorch for intra-op parallelism"),
+    ("rl_torch_thread_utilization", "gauge", "CPU time used by the process per PyTorch thread (0 to 1)"),
+)
+
+# Name, type and description of each metric of the watched memories (labelled by memory name)
+MEMORY_METRICS = (
+    ("rl_memory_experiences", "gauge", "Experiences stored in the memory"),
+    ("rl_memory_capacity", "gauge", "Maximum amount of experiences stored in the memory"),
+    ("rl_memory_bytes", "gauge", "Memory used by the stored experiences"),
+)
+
+
+# TELEMETRY #
+class Telemetry:
+    """
+    Telemetry collects resource and throughput metrics of a training process.
+
+    The algorithms increment the step and update counters (see count_steps and count_update), while a
+    background thread samples all metrics every "interval" seconds. The latest sample is exposed in the
+    Prometheus text format through a local HTTP endpoint (any path, usually /metrics) and / or a file.
+
+    Each counter must only be incremented by a single thread (steps by the collecting thread
+    and updates by the training thread)
+
+    Parameters
+    ----------
+    interval: float
+        Time between samples, in seconds
+    file_path: str, optional
+        If specified, the latest sample is written to this file (replaced atomically after each sample)
+    port: int, optional
+        If specified, the latest sample is served through HTTP on this port (0 chooses a free port)
+    host: str
+        Address where the HTTP endpoint listens. Only local connections are accepted by default
+    """
+
+    # ATTRIBUTES #
+
+    # Time between samples, in seconds
+    interval: float
+    # File where the latest sample is written (None if not used)
+    file_path: Optional[str]
+    # Port and address of the HTTP endpoint (port is None if not used)
+    port: Optional[int]
+    host: str
+
+    # Counters, incremented by the algorithms
+    env_steps: int
+    gradient_updates: int
+    update_samples: int
+
+    # Memories whose occupancy is sampled, by name. Callables are called to obtain the current memory
+    memories: Dict[str, Any]
+    # Latest sample of the metrics
+    metrics: Dict[str, float]
+
+    # Values of the previous sample, used to compute the rates
+    _previous: Optional[Tuple[float, float, int, int, int]]
+    # Latest sample, in Prometheus text format
+    _text: str
+    # Background thread, HTTP server and event used to stop the sampling
+    _thread: Optional[threading.Thread]
+    _server: Optional[ThreadingHTTPServer]
+    _stop_event: threading.Event
+
+    # CONSTRUCTOR #
+    def __init__(self, interval=1.0, file_path=None, port=None, host="127.0.0.1"):
+
+        self.interval = interval
+        self.file_path = file_path
+        self.port = port
+        self.host = host
+
+        # Counters start at 0
+        self.env_steps = 0
+        self.gradient_updates = 0
+        self.update_samples = 0
+
+        self.memories = {}
+        self.metrics = {}
+
+        self._previous = None
+        self._text = ""
+        self._thread = None
+        self._server = None
+        self._stop_event = threading.Event()
+
+    # METHODS #
+
+    # Counters
+    def count_steps(self, steps=1):
+        """
+        Counts environment steps
+
+        Parameters
+        ----------
+        steps: int
+        """
+
+        self.env_steps += steps
+
+    def count_update(self, samples=0):
+        """
+        Counts a gradient update (optimizer step)
+
+        Parameters
+        ----------
+        samples: int
+            Amount of experiences used by the update
+        """
+
+        self.gradient_updates += 1
+        self.update_samples += samples
+
+    def watch_memory(self, name, memory):
+        """
+        Adds a memory (ReplayBuffer or ReplayMemory) whose occupancy and size are sampled.
+
+        If the memory is replaced during training, a callable returning the current memory can be specified instead
+
+        Parameters
+        ----------
+        name: str
+            Name of the memory, used as the label of its metrics
+        memory: ReplayBuffer or ReplayMemory or Callable
+        """
+
+        self.memories[name] = memory
+
+    # Sampling
+    def start(self):
+        """
+        Takes a first sample and starts the background sampling thread and the HTTP endpoint (if used)
+        """
+
+        if self._thread is not None:
+            return
+
+        self.sample()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+        if self.port is not None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="telemetry-http", daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the background thread and the HTTP endpoint, taking a last sample
+        """
+
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        self.sample()
+
+    def sample(self):
+        """
+        Samples all metrics, updating the exposed values (and the file, if used)
+
+        Returns
+        -------
+        dict[str, float]
+            Process-wide metrics of the sample
+        """
+
+        current_time = time.perf_counter()
+        cpu_time = time.process_time()
+        env_steps, gradient_updates, update_samples = self.env_steps, self.gradient_updates, self.update_samples
+
+        metrics = {"rl_env_steps_total": env_steps, "rl_gradient_updates_total": gradient_updates,
+                   "rl_process_resident_memory_bytes": _resident_memory(), "rl_process_cpu_seconds_total": cpu_time}
+
+        # Rates since the previous sample
+        elapsed = cpu_elapsed = None
+        if self._previous is not None:
+            previous_time, previous_cpu, previous_steps, previous_updates, previous_samples = self._previous
+            elapsed = max(current_time - previous_time, 1e-9)
+            metrics["rl_env_steps_per_second"] = (env_steps - previous_steps) / elapsed
+            metrics["rl_gradient_updates_per_second"] = (gradient_updates - previous_updates) / elapsed
+            metrics["rl_update_samples_per_second"] = (update_samples - previous_samples) / elapsed
+            cpu_elapsed = cpu_time - previous_cpu
+        self._previous = (current_time, cpu_time, env_steps, gradient_updates, update_samples)
+
+        # PyTorch threads (only if PyTorch is already used by the process)
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            threads = torch.get_num_threads()
+            metrics["rl_torch_threads"] = threads
+            if elapsed is not None:
+                metrics["rl_torch_thread_utilization"] = cpu_elapsed / (elapsed * threads)
+
+        self.metrics = metrics
+        self._text = self._format(metrics, self._sample_memories())
+
+        if self.file_path is not None:
+            with open(self.file_path + ".tmp", "w") as metrics_file:
+                metrics_file.write(self._text)
+            os.replace(self.file_path + ".tmp", self.file_path)
+
+        return metrics
+
+    def to_prometheus(self):
+        """
+        Returns the latest sample in the Prometheus text format
+
+        Returns
+        -------
+        str
+        """
+
+        return self._text
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # HELPER METHODS #
+    def _run(self):
+        """
+        Samples the metrics every interval until the telemetry is stopped
+        """
+
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def _sample_memories(self):
+        """
+        Samples the occupancy and size of all watched memories
+
+        Returns
+        -------
+        dict[str, dict[str, float]]
+            Metrics of each memory, by memory name
+        """
+
+        samples = {}
+        for name, memory in list(self.memories.items()):
+            if callable(memory):
+                memory = memory()
+            if memory is None:
+                continue
+
+            # Replay memories have a fixed capacity, while replay buffers grow during the epoch
+            if hasattr(memory, "capacity"):
+                samples[name] = {"rl_memory_experiences": len(memory), "rl_memory_capacity": memory.capacity}
+            else:
+                samples[name] = {"rl_memory_experiences": len(memory.storage)}
+            samples[name]["rl_memory_bytes"] = memory.nbytes
+
+        return samples
+
+    @staticmethod
+    def _format(metrics, memory_metrics):
+        """
+        Formats a sample in the Prometheus text format
+
+        Parameters
+        ----------
+        metrics: dict[str, float]
+        memory_metrics: dict[str, dict[str, float]]
+
+        Returns
+        -------
+        str
+        """
+
+        lines = []  # type: List[str]
+        for name, metric_type, description in METRICS:
+            if name in metrics:
+                lines += ["# HELP {} {}".format(name, description), "# TYPE {} {}".format(name, metric_type),
+                          "{} {}".format(name, _format_value(metrics[name]))]
+
+        for name, metric_type, description in MEMORY_METRICS:
+            values = [(memory, sample[name]) for memory, sample in memory_metrics.items() if name in sample]
+            if values:
+                lines += ["# HELP {} {}".format(name, description), "# TYPE {} {}".format(name, metric_type)]
+                lines += ['{}{{memory="{}"}} {}'.format(name, memory, _format_value(value)) for memory, value in values]
+
+        return "\n".join(lines) + "\n"
+
+
+# STATIC METHODS
+
+def _resident_memory():
+    """
+    Returns the current resident memory (RSS) of the process, in bytes.
+
+    Where /proc is not available, the peak resident memory is returned instead
+
+    Returns
+    -------
+    int
+    """
+
+    try:
+        with open("/proc/self/statm") as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0
+
+    # ru_maxrss is measured in bytes on macOS and in kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_value(value):
+    """
+    Formats a metric value (integers are kept exact)
+
+    Parameters
+    ----------
+    value: float
+
+    Returns
+    -------
+    str
+    """
+
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _make_handler(telemetry):
+    """
+    Creates the HTTP request handler serving the latest sample of a telemetry
+
+    Parameters
+    ----------
+    telemetry: Telemetry
+
+    Returns
+    -------
+    type
+    """
+
+    class TelemetryHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = telemetry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Requests are not logged, to keep the training output clean
+            pass
+
+    return TelemetryHandler